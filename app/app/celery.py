@@ -5,9 +5,24 @@ from django.conf import settings
 import os
 
 from celery import Celery
+from celery.signals import task_prerun
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 app = Celery('app')
 app.config_from_object("django.conf:settings", namespace='CELERY')
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
+
+
+@task_prerun.connect
+def check_database_connections(sender=None, **kwargs):
+    """
+    Worker keeps connections for CONN_MAX_AGE like the web app,
+    make sure reused connection is still alive before task runs.
+    """
+    if getattr(sender.request, 'is_eager', False):
+        return
+
+    from core.db import close_unusable_connections
+
+    close_unusable_connections()
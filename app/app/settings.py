@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/4.0/ref/settings/
 from pathlib import Path
 import os
 
+from celery.schedules import crontab
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -70,7 +72,7 @@ OAUTH2_PROVIDER = {
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'oauth2_provider.contrib.rest_framework.OAuth2Authentication',
+        'user.authentication.CachedOAuth2Authentication',
         'drf_social_oauth2.authentication.SocialAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': (
@@ -88,6 +90,19 @@ REST_FRAMEWORK = {
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
 }
 
+# Pagination settings
+
+RESTAURANTS_PAGE_SIZE = int(os.environ.get('RESTAURANTS_PAGE_SIZE', '20'))
+ORDERS_PAGE_SIZE = int(os.environ.get('ORDERS_PAGE_SIZE', '20'))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', '100'))
+ORDER_SUMMARY_TOP_ITEMS = int(os.environ.get('ORDER_SUMMARY_TOP_ITEMS', '3'))
+ORDER_BULK_MAX_SIZE = int(os.environ.get('ORDER_BULK_MAX_SIZE', '100'))
+IDEMPOTENCY_KEY_TIMEOUT = int(
+    os.environ.get('IDEMPOTENCY_KEY_TIMEOUT', str(24 * 3600)))
+# Has to be longer than any request, e.g. web server worker timeout
+IDEMPOTENCY_LOCK_TIMEOUT = int(
+    os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', '600'))
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -131,6 +146,12 @@ DATABASES = {
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
+        'PORT': os.environ.get('DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', '1'))),
+        'DISABLE_SERVER_SIDE_CURSORS': bool(
+            int(os.environ.get('DB_DISABLE_SERVER_SIDE_CURSORS', '0'))),
     }
 }
 
@@ -141,6 +162,28 @@ CACHES = {
     }
 }
 
+MENU_CACHE_TIMEOUT = int(os.environ.get('MENU_CACHE_TIMEOUT', '3600'))
+RESTAURANT_HTTP_MAX_AGE = int(os.environ.get('RESTAURANT_HTTP_MAX_AGE', '0'))
+RESTAURANT_HTTP_SHARED_MAX_AGE = int(
+    os.environ.get('RESTAURANT_HTTP_SHARED_MAX_AGE', '60'))
+RESTAURANT_VERSION_TIMEOUT = int(
+    os.environ.get('RESTAURANT_VERSION_TIMEOUT', str(24 * 3600)))
+TOKEN_CACHE_TIMEOUT = int(os.environ.get('TOKEN_CACHE_TIMEOUT', '300'))
+TOKEN_LOCAL_CACHE_TIMEOUT = int(
+    os.environ.get('TOKEN_LOCAL_CACHE_TIMEOUT', '30'))
+TOKEN_LOCAL_CACHE_SIZE = int(os.environ.get('TOKEN_LOCAL_CACHE_SIZE', '1024'))
+TOKEN_CORE_CACHE_TIMEOUT = int(
+    os.environ.get('TOKEN_CORE_CACHE_TIMEOUT', '300'))
+TOKEN_CORE_CACHE_SIZE = int(os.environ.get('TOKEN_CORE_CACHE_SIZE', '64'))
+
+# Expired token cleanup settings
+
+TOKEN_CLEANUP_BATCH_SIZE = int(os.environ.get('TOKEN_CLEANUP_BATCH_SIZE', '1000'))
+TOKEN_CLEANUP_BATCH_INTERVAL = float(
+    os.environ.get('TOKEN_CLEANUP_BATCH_INTERVAL', '1'))
+TOKEN_CLEANUP_STALL_TIMEOUT = int(
+    os.environ.get('TOKEN_CLEANUP_STALL_TIMEOUT', '600'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -209,3 +252,28 @@ CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND')
 CELERY_ACCEPT_CONTENT=('json',)
 CELERY_TASK_SERIALIZER='json'
 CELERY_RESULT_SERIALIZER='json'
+CELERY_BEAT_SCHEDULE = {
+    'refresh-delivery-matrix': {
+        'task': 'orders.tasks.refresh_delivery_matrix',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'clear-expired-tokens': {
+        'task': 'user.tasks.clear_expired_tokens',
+        'schedule': crontab(hour=4, minute=0),
+    },
+}
+
+# Delivery time settings
+
+DISTANCE_BACKEND = os.environ.get('DISTANCE_BACKEND') or \
+    'orders.distance.DistanceMatrixBackend'
+DISTANCE_MATRIX_KEY = os.environ.get('MATRIX_KEY')
+DISTANCE_MATRIX_TIMEOUT = float(os.environ.get('DISTANCE_MATRIX_TIMEOUT', '5'))
+DISTANCE_CACHE_TIMEOUT = int(os.environ.get('DISTANCE_CACHE_TIMEOUT', '21600'))
+DISTANCE_LOCAL_CACHE_SIZE = int(
+    os.environ.get('DISTANCE_LOCAL_CACHE_SIZE', '1024'))
+DISTANCE_LOCK_TIMEOUT = DISTANCE_MATRIX_TIMEOUT * 2
+DELIVERY_MATRIX_MAX_AGE = int(
+    os.environ.get('DELIVERY_MATRIX_MAX_AGE', str(7 * 24 * 3600)))
+DELIVERY_MATRIX_BATCH_SIZE = int(
+    os.environ.get('DELIVERY_MATRIX_BATCH_SIZE', '25'))
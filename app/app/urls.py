@@ -18,6 +18,8 @@ from django.urls import path, include
 from django.views.generic import TemplateView
 
 from core.views import health_check
+from orders.views import order_list_async, order_detail_async
+from restaurant.views import restaurant_list_async, restaurant_detail_async
 from user.views import (BearerTokenFormView,
                         UserCreateFormView,
                         RefreshTokenFormView)
@@ -29,6 +31,18 @@ urlpatterns = [
     path('api/auth/', include('drf_social_oauth2.urls', namespace='drf')),
     path('api/health/', health_check, name='health-check'),
     path('api/orders/', include('orders.urls')),
+    path('api/async/restaurants/',
+         restaurant_list_async,
+         name='restaurant-list-async'),
+    path('api/async/restaurants/<slug:slug>/',
+         restaurant_detail_async,
+         name='restaurant-detail-async'),
+    path('api/async/orders/',
+         order_list_async,
+         name='order-list-async'),
+    path('api/async/orders/<int:id>/',
+         order_detail_async,
+         name='order-detail-async'),
     path('docs/',
          TemplateView.as_view(template_name='docs/redoc.html'),
          name='docs'),
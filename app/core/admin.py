@@ -3,7 +3,10 @@ from django.apps import apps
 from django.utils.translation import gettext as _
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
-from .models import User
+from .models import User, Order, OrderMeal, OrderDrink
+from .pricing import reprice_order
+
+from orders.serializers import summarize_order
 
 
 class UserAdmin(BaseUserAdmin):
@@ -26,7 +29,49 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class OrderMealInline(admin.TabularInline):
+    model = OrderMeal
+    readonly_fields = ('name', 'unit_price', 'line_total')
+    extra = 0
+
+
+class OrderDrinkInline(admin.TabularInline):
+    model = OrderDrink
+    readonly_fields = ('name', 'unit_price', 'line_total')
+    extra = 0
+
+
+class OrderAdmin(admin.ModelAdmin):
+    inlines = (OrderMealInline, OrderDrinkInline)
+    readonly_fields = ('total_price', 'delivery_price')
+    list_display = ('id', 'restaurant_name', 'order_time', 'total_price')
+
+    def save_formset(self, request, form, formset, change):
+        """
+        Lines keep name and unit price they were ordered with, only new
+        lines and lines with other meal or drink take current ones
+        """
+        lines = formset.save(commit=False)
+        for line, changed_data in formset.changed_objects:
+            if 'meal' in changed_data or 'drink' in changed_data:
+                line.name = ''
+                line.unit_price = None
+        for line in lines:
+            line.save()
+        for line in formset.deleted_objects:
+            line.delete()
+        formset.save_m2m()
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        """Total and summary are kept unless ordered items changed"""
+        if any(formset.has_changed() for formset in formsets):
+            reprice_order(form.instance)
+            summarize_order(form.instance)
+
+
 admin.site.register(User, UserAdmin)
+admin.site.register(Order, OrderAdmin)
 
 for model in apps.get_models():
     try:
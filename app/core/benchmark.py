@@ -0,0 +1,467 @@
+"""
+Query count, latency and allocation benchmarks of every API endpoint.
+"""
+
+import itertools
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import timedelta
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver, reverse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from oauth2_provider.models import get_access_token_model, Application
+
+from core.models import (Cuisine, Restaurant, Tag, Meal, Drink, Menu, Order,
+                         OrderMeal, OrderDrink)
+from core.pricing import price_order
+from orders.serializers import summarize, order_lines
+from user.tokens import create_token
+
+PASSWORD = 'benchmark-password'
+
+"""URLs of third party apps which are not benchmarked, besides token view"""
+SKIPPED_NAMESPACES = ('admin', 'drf')
+BENCHMARKED_THIRD_PARTY = ('drf:token',)
+"""Router root views are shadowed by list views registered at the same URL"""
+SKIPPED_NAMES = ('restaurant:api-root', 'orders:api-root')
+"""Growth below these is noise of fast endpoints, not regression"""
+MIN_LATENCY_GROWTH_MS = 2.0
+MIN_PEAK_GROWTH_KIB = 32.0
+
+Seed = namedtuple(
+    'Seed',
+    ('volumes', 'user', 'token', 'application', 'restaurant', 'meals',
+     'drinks', 'order', 'counter'))
+Endpoint = namedtuple('Endpoint', ('name', 'method', 'status', 'prepare'))
+Result = namedtuple('Result', ('queries', 'p50', 'p95', 'peak_kib'))
+
+
+def seed(restaurants=2000, menu_items=120, users=50, orders=300):
+    """
+    Fill database with restaurants which menus have menu_items meals and
+    drinks, and users with given number of orders each
+    """
+    cuisines = Cuisine.objects.bulk_create(
+        [Cuisine(name=f'cuisine{i}') for i in range(10)])
+    tag = Tag.objects.create(name='benchmark')
+    Meal.objects.bulk_create([
+        Meal(name=f'meal{i}',
+             price=Decimal(10 + i % 40) + Decimal('0.50'),
+             description='benchmark meal',
+             tag=tag)
+        for i in range(menu_items)])
+    Drink.objects.bulk_create([
+        Drink(name=f'drink{i}', price=Decimal(2 + i % 8), tag=tag)
+        for i in range(max(menu_items // 4, 1))])
+    meals = list(Meal.objects.order_by('id'))
+    drinks = list(Drink.objects.order_by('id'))
+
+    Restaurant.objects.bulk_create([
+        Restaurant(name=f'restaurant {i}',
+                   slug=f'restaurant-{i}',
+                   city='Warsaw',
+                   address=f'street {i}',
+                   post_code='00-001',
+                   phone='123456789',
+                   cuisine=cuisines[i % len(cuisines)],
+                   delivery_price=Decimal('7.50'))
+        for i in range(restaurants)], batch_size=1000)
+    all_restaurants = list(Restaurant.objects.order_by('id'))
+    Menu.objects.bulk_create(
+        [Menu(restaurant=restaurant) for restaurant in all_restaurants],
+        batch_size=1000)
+    menu_ids = list(Menu.objects.order_by('id').values_list('id', flat=True))
+    Menu.meals.through.objects.bulk_create([
+        Menu.meals.through(menu_id=menu_id, meal_id=meal.id)
+        for menu_id in menu_ids for meal in meals], batch_size=5000)
+    Menu.drinks.through.objects.bulk_create([
+        Menu.drinks.through(menu_id=menu_id, drink_id=drink.id)
+        for menu_id in menu_ids for drink in drinks], batch_size=5000)
+
+    """Password is hashed once, hashing it per user would dominate seeding"""
+    password = make_password(PASSWORD)
+    get_user_model().objects.bulk_create([
+        get_user_model()(email=f'user{i}@benchmark.com',
+                         name=f'user{i}',
+                         password=password)
+        for i in range(max(users, 1))], batch_size=1000)
+    all_users = list(get_user_model().objects.order_by('id'))
+
+    for user in all_users:
+        seed_orders(user, all_restaurants, meals, drinks, orders)
+
+    user = all_users[0]
+    """Token form views issue tokens for client configured in environment"""
+    application = Application.objects.create(
+        client_id=os.environ.get('CLIENT_ID') or 'benchmark-client',
+        client_secret=client_secret(),
+        client_type=Application.CLIENT_CONFIDENTIAL,
+        authorization_grant_type=Application.GRANT_PASSWORD,
+        name='benchmark',
+        user=user)
+
+    return Seed(
+        volumes={'restaurants': restaurants, 'menu_items': menu_items,
+                 'users': users, 'orders': orders},
+        user=user,
+        token=access_token(user, application),
+        application=application,
+        restaurant=all_restaurants[0],
+        meals=meals,
+        drinks=drinks,
+        order=Order.objects.filter(user=user).order_by('id').first(),
+        counter=itertools.count())
+
+
+def seed_orders(user, restaurants, meals, drinks, count):
+    """Create orders of user the same way order serializers do"""
+    orders, lines = [], []
+
+    for i in range(count):
+        restaurant = restaurants[i % len(restaurants)]
+        order_meals = [{'meal': meals[i % len(meals)], 'quantity': 2},
+                       {'meal': meals[(i + 1) % len(meals)], 'quantity': 1}]
+        order_drinks = [{'drink': drinks[i % len(drinks)], 'quantity': 1}]
+        price = price_order(order_meals, order_drinks,
+                            restaurant.delivery_price)
+        item_count, top_items = summarize(order_meals, order_drinks)
+        orders.append(Order(
+            user=user,
+            restaurant=restaurant,
+            restaurant_name=str(restaurant),
+            delivery_address='benchmark address',
+            delivery_city='Warsaw',
+            delivery_post_code='00-001',
+            delivery_phone='123456789',
+            total_price=price.total,
+            delivery_price=price.delivery,
+            item_count=item_count,
+            top_items=top_items))
+        lines.append((order_meals, order_drinks, price))
+
+    Order.objects.bulk_create(orders, batch_size=1000)
+    order_meals, order_drinks = [], []
+
+    for order, data in zip(Order.objects.filter(user=user).order_by('id'),
+                           lines):
+        meal_lines, drink_lines = order_lines(order, *data)
+        order_meals += meal_lines
+        order_drinks += drink_lines
+
+    OrderMeal.objects.bulk_create(order_meals, batch_size=1000)
+    OrderDrink.objects.bulk_create(order_drinks, batch_size=1000)
+
+
+def client_secret():
+    return os.environ.get('CLIENT_SECRET') or 'benchmark-secret'
+
+
+def access_token(user, application):
+    return get_access_token_model().objects.create(
+        user=user,
+        application=application,
+        token=f'benchmark-{user.id}-{time.time_ns()}',
+        expires=timezone.now() + timedelta(days=1),
+        scope='read write').token
+
+
+def new_user(data, prefix):
+    """Fresh user for endpoints which change or lock their user"""
+    number = next(data.counter)
+    return get_user_model().objects.create_user(
+        email=f'{prefix}{number}@benchmark.com',
+        name=f'{prefix}{number}',
+        password=PASSWORD)
+
+
+def bearer(token):
+    return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+
+def json_body(data):
+    return {'data': data, 'content_type': 'application/json'}
+
+
+def form_body(data):
+    return {'data': urlencode(data),
+            'content_type': 'application/x-www-form-urlencoded'}
+
+
+def order_payload(data):
+    return {
+        'restaurant': data.restaurant.id,
+        'meals': [{'meal': meal.id, 'quantity': 2}
+                  for meal in data.meals[:3]],
+        'drinks': [{'drink': data.drinks[0].id, 'quantity': 1}],
+        'delivery_city': 'Warsaw',
+        'delivery_address': 'benchmark address',
+        'delivery_post_code': '00-001',
+        'delivery_phone': '123456789',
+    }
+
+
+def get(url_name, url_kwargs=None):
+    """Prepare function of request sent with benchmark user token"""
+    def prepare(data):
+        kwargs = url_kwargs(data) if url_kwargs else None
+        return {'path': reverse(url_name, kwargs=kwargs),
+                **bearer(data.token)}
+    return prepare
+
+
+def restaurant_slug(data):
+    return {'slug': data.restaurant.slug}
+
+
+def order_id(data):
+    return {'id': data.order.id}
+
+
+def create_user_api(data):
+    number = next(data.counter)
+    return {'path': reverse('user:create-user'), **json_body({
+        'email': f'api{number}@benchmark.com',
+        'name': f'api{number}',
+        'password': PASSWORD})}
+
+
+def password_change(data):
+    user = new_user(data, 'change')
+    return {'path': reverse('user:password-change'),
+            **bearer(access_token(user, data.application)),
+            **json_body({'old_password': PASSWORD,
+                         'new_password': f'{PASSWORD}-changed'})}
+
+
+def reset_password(data):
+    """Every request comes from other address to pass anonymous throttle"""
+    number = next(data.counter)
+    return {'path': reverse('user:reset-password'),
+            'HTTP_X_FORWARDED_FOR': f'10.{number // 65536 % 256}.'
+                                    f'{number // 256 % 256}.{number % 256}',
+            **json_body({'email': data.user.email})}
+
+
+def reset_password_confirm(data):
+    user = data.user
+    return {'path': reverse('user:reset-password-confirm', kwargs={
+        'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+        'token': default_token_generator.make_token(user)})}
+
+
+def oauth_token(data):
+    return {'path': reverse('drf:token'), **json_body({
+        'grant_type': 'password',
+        'username': data.user.email,
+        'password': PASSWORD,
+        'client_id': data.application.client_id,
+        'client_secret': client_secret()})}
+
+
+def create_order(data):
+    return {'path': reverse('orders:order-create'), **bearer(data.token),
+            **json_body(order_payload(data))}
+
+
+def bulk_create_orders(data):
+    return {'path': reverse('orders:order-bulk'), **bearer(data.token),
+            **json_body([order_payload(data) for _ in range(10)])}
+
+
+def generate_token_form(data):
+    user = new_user(data, 'form')
+    return {'path': reverse('token-generate'),
+            **form_body({'email': user.email, 'password': PASSWORD})}
+
+
+def create_user_form(data):
+    number = next(data.counter)
+    return {'path': reverse('create-user'), **form_body({
+        'email': f'created{number}@benchmark.com',
+        'name': f'created{number}',
+        'password': PASSWORD})}
+
+
+def refresh_token_form(data):
+    user = new_user(data, 'refresh')
+    token = create_token(username=user.email, password=PASSWORD)
+    return {'path': reverse('token-refresh'), **form_body({
+        'refresh_token': token.get('refresh_token', 'missing')})}
+
+
+ENDPOINTS = (
+    Endpoint('restaurant:restaurant-list', 'get', 200,
+             get('restaurant:restaurant-list')),
+    Endpoint('restaurant:restaurant-detail', 'get', 200,
+             get('restaurant:restaurant-detail', restaurant_slug)),
+    Endpoint('user:create-user', 'post', 201, create_user_api),
+    Endpoint('user:user-detail', 'get', 200, get('user:user-detail')),
+    Endpoint('user:password-change', 'put', 200, password_change),
+    Endpoint('user:reset-password', 'post', 200, reset_password),
+    Endpoint('user:reset-password-confirm', 'get', 302,
+             reset_password_confirm),
+    Endpoint('drf:token', 'post', 200, oauth_token),
+    Endpoint('health-check', 'get', 200, get('health-check')),
+    Endpoint('orders:order-create', 'post', 201, create_order),
+    Endpoint('orders:order-bulk', 'post', 201, bulk_create_orders),
+    Endpoint('orders:order-list', 'get', 200, get('orders:order-list')),
+    Endpoint('orders:order-detail', 'get', 200,
+             get('orders:order-detail', order_id)),
+    Endpoint('restaurant-list-async', 'get', 200,
+             get('restaurant-list-async')),
+    Endpoint('restaurant-detail-async', 'get', 200,
+             get('restaurant-detail-async', restaurant_slug)),
+    Endpoint('order-list-async', 'get', 200, get('order-list-async')),
+    Endpoint('order-detail-async', 'get', 200,
+             get('order-detail-async', order_id)),
+    Endpoint('docs', 'get', 200, get('docs')),
+    Endpoint('main-page', 'get', 200, get('main-page')),
+    Endpoint('token-generate', 'post', 200, generate_token_form),
+    Endpoint('create-user', 'post', 302, create_user_form),
+    Endpoint('token-refresh', 'post', 200, refresh_token_form),
+    Endpoint('password-reset', 'get', 200, get('password-reset')),
+)
+
+
+def url_names(patterns=None, namespace=''):
+    """Names of all URL patterns with their namespaces"""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLPattern):
+            if pattern.name:
+                names.add(namespace + pattern.name)
+        else:
+            names |= url_names(
+                pattern.url_patterns,
+                namespace + (f'{pattern.namespace}:'
+                             if pattern.namespace else ''))
+    return names
+
+
+def uncovered_endpoints():
+    """URL names which have no benchmark, so new endpoints are not missed"""
+    benchmarked = {endpoint.name for endpoint in ENDPOINTS}
+    return sorted(
+        name for name in url_names()
+        if name not in benchmarked
+        and name not in SKIPPED_NAMES
+        and (name.split(':')[0] not in SKIPPED_NAMESPACES
+             or name in BENCHMARKED_THIRD_PARTY))
+
+
+def send(client, endpoint, data):
+    """Prepare and send one request, return response and its duration"""
+    kwargs = endpoint.prepare(data)
+    start = time.perf_counter()
+    response = getattr(client, endpoint.method)(**kwargs)
+    duration = (time.perf_counter() - start) * 1000
+
+    if response.status_code != endpoint.status:
+        raise AssertionError(
+            f'{endpoint.name} responded with {response.status_code}, '
+            f'expected {endpoint.status}')
+    return response, duration
+
+
+def percentiles(timings):
+    """Return p50 and p95 of timings in milliseconds"""
+    p95 = statistics.quantiles(timings, n=20)[-1] \
+        if len(timings) > 1 else timings[0]
+    return statistics.median(timings), p95
+
+
+def measure(client, endpoint, data, runs):
+    """
+    Measure endpoint after one warm up request, which fills caches the
+    same way they are filled between requests of running application
+    """
+    send(client, endpoint, data)
+    timings, queries = [], 0
+
+    for _ in range(runs):
+        with CaptureQueriesContext(connection) as captured:
+            _, duration = send(client, endpoint, data)
+        timings.append(duration)
+        queries = max(queries, len(captured))
+
+    """Tracing allocations slows requests down, so it has its own run"""
+    tracemalloc.start()
+    try:
+        send(client, endpoint, data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    p50, p95 = percentiles(timings)
+    return Result(queries, round(p50, 2), round(p95, 2),
+                  round(peak / 1024, 1))
+
+
+def run_benchmarks(data, runs=20, names=None):
+    """Return results of endpoints, all of them when names are not given"""
+    client = Client()
+    return {endpoint.name: measure(client, endpoint, data, runs)
+            for endpoint in ENDPOINTS
+            if names is None or endpoint.name in names}
+
+
+def compare(results, baseline, latency_tolerance, memory_tolerance):
+    """Return descriptions of results which are worse than baseline"""
+    regressions = []
+
+    for name, result in results.items():
+        base = baseline['endpoints'].get(name)
+        if base is None:
+            regressions.append(f'{name}: missing in baseline')
+            continue
+
+        if result.queries > base['queries']:
+            regressions.append(
+                f'{name}: {result.queries} queries, '
+                f'baseline {base["queries"]}')
+        if result.p95 > base['p95'] * (1 + latency_tolerance) and \
+                result.p95 - base['p95'] > MIN_LATENCY_GROWTH_MS:
+            regressions.append(
+                f'{name}: p95 {result.p95:.2f} ms, '
+                f'baseline {base["p95"]:.2f} ms')
+        if result.peak_kib > base['peak_kib'] * (1 + memory_tolerance) and \
+                result.peak_kib - base['peak_kib'] > MIN_PEAK_GROWTH_KIB:
+            regressions.append(
+                f'{name}: peak {result.peak_kib} KiB, '
+                f'baseline {base["peak_kib"]} KiB')
+
+    return regressions
+
+
+def load_baseline(path):
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(path, volumes, vendor, results):
+    with open(path, 'w') as baseline_file:
+        json.dump({
+            'volumes': volumes,
+            'vendor': vendor,
+            'endpoints': {name: result._asdict()
+                          for name, result in sorted(results.items())},
+        }, baseline_file, indent=2)
+        baseline_file.write('\n')
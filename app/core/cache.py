@@ -0,0 +1,72 @@
+"""
+Helpers shared by caches of the apps.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+
+import time
+
+from redis.exceptions import RedisError
+
+MISSING = object()
+
+
+class LocalCache:
+    """In-process LRU cache with time to live"""
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.data = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            value, expires = self.data.get(key, (MISSING, 0))
+
+            if value is MISSING:
+                return MISSING
+
+            if expires < time.monotonic():
+                del self.data[key]
+                return MISSING
+
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        """Store value, timeout can only shorten default time to live"""
+        timeout = self.timeout if timeout is None \
+            else min(timeout, self.timeout)
+
+        with self.lock:
+            self.data[key] = (value, time.monotonic() + timeout)
+            self.data.move_to_end(key)
+
+            while len(self.data) > self.maxsize:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+def call_cache(method, *args, default=MISSING, **kwargs):
+    """Call shared cache and ignore Redis being unavailable"""
+    try:
+        return method(*args, **kwargs)
+    except RedisError:
+        return default
+
+
+async def acall_cache(method, *args, default=MISSING, **kwargs):
+    """Await async method of shared cache, like call_cache()"""
+    try:
+        return await method(*args, **kwargs)
+    except RedisError:
+        return default
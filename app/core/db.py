@@ -0,0 +1,23 @@
+"""
+Health checks of persistent database connections.
+"""
+
+import django
+from django.db import connections
+
+"""Django 4.1+ checks connections itself when CONN_HEALTH_CHECKS is set"""
+NATIVE_HEALTH_CHECKS = django.VERSION >= (4, 1)
+
+
+def close_unusable_connections(**kwargs):
+    """Close reused connections which were dropped by database server"""
+    if NATIVE_HEALTH_CHECKS:
+        return
+
+    for conn in connections.all():
+        if conn.connection is None or \
+                not conn.settings_dict.get('CONN_HEALTH_CHECKS'):
+            continue
+
+        if not conn.is_usable():
+            conn.close()
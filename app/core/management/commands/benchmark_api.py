@@ -0,0 +1,163 @@
+"""
+Command to benchmark API endpoints against stored baseline.
+"""
+
+import os
+from unittest.mock import patch
+
+from celery.app.task import Task
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (override_settings, setup_databases,
+                               setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+
+from core import benchmark
+
+VOLUMES = ('restaurants', 'menu_items', 'users', 'orders')
+
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    }
+}
+
+
+class Command(BaseCommand):
+    """Benchmark API endpoints command."""
+    help = 'Measure queries, p50/p95 latency and peak allocations of every ' \
+        'endpoint on seeded test database and compare them with baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=2000)
+        parser.add_argument(
+            '--menu-items',
+            type=int,
+            default=120,
+            help='Meals in every menu, a quarter of it drinks')
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument(
+            '--orders', type=int, default=300, help='Orders of every user')
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            help='URL name of endpoint to benchmark, can be given several '
+                 'times, all endpoints by default')
+        parser.add_argument(
+            '--baseline',
+            default=os.path.join(settings.BASE_DIR, 'benchmark_baseline.json'))
+        parser.add_argument(
+            '--update-baseline',
+            action='store_true',
+            help='Store results as new baseline instead of comparing them')
+        parser.add_argument(
+            '--latency-tolerance',
+            type=float,
+            default=0.5,
+            help='Allowed p95 growth, 0.5 is 50%%')
+        parser.add_argument(
+            '--memory-tolerance',
+            type=float,
+            default=0.2,
+            help='Allowed peak allocation growth, 0.2 is 20%%')
+
+    def load_baseline(self, path, volumes, vendor):
+        if not os.path.exists(path):
+            raise CommandError(
+                f'No baseline in {path}, run with --update-baseline to '
+                f'store one')
+
+        baseline = benchmark.load_baseline(path)
+        if baseline['volumes'] != volumes:
+            raise CommandError(
+                f'Baseline was measured on {baseline["volumes"]}, '
+                f'not on {volumes}')
+        if baseline.get('vendor') != vendor:
+            raise CommandError(
+                f'Baseline was measured on {baseline.get("vendor")} '
+                f'database, not on {vendor}, run with --update-baseline '
+                f'to store one for it')
+        return baseline
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"endpoint":<32} {"queries":>7} {"p50 ms":>9} {"p95 ms":>9} '
+            f'{"peak KiB":>9}')
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<32} {result.queries:>7} {result.p50:>9.2f} '
+                f'{result.p95:>9.2f} {result.peak_kib:>9.1f}')
+
+    def benchmark(self, options):
+        """Seed data and measure endpoints"""
+        self.stdout.write('Seeding data...')
+        data = benchmark.seed(restaurants=options['restaurants'],
+                              menu_items=options['menu_items'],
+                              users=options['users'],
+                              orders=options['orders'])
+
+        self.stdout.write('Measuring endpoints...')
+        return benchmark.run_benchmarks(
+            data, runs=options['runs'], names=options['endpoint'])
+
+    def handle(self, *args, **options):
+        """Entrypoint"""
+        uncovered = benchmark.uncovered_endpoints()
+        if uncovered:
+            raise CommandError(
+                f'Endpoints without benchmark: {", ".join(uncovered)}')
+
+        unknown = set(options['endpoint'] or ()) - {
+            endpoint.name for endpoint in benchmark.ENDPOINTS}
+        if unknown:
+            raise CommandError(
+                f'Unknown endpoints: {", ".join(sorted(unknown))}')
+
+        if options['update_baseline'] and options['endpoint']:
+            raise CommandError(
+                'Baseline can be updated only with all endpoints')
+
+        """Baseline is checked before long run, not after it"""
+        volumes = {name: options[name] for name in VOLUMES}
+        vendor = connection.vendor
+        if not options['update_baseline']:
+            baseline = self.load_baseline(options['baseline'], volumes,
+                                          vendor)
+
+        """
+        Seeded data goes to test database, cache is local to this process
+        and tasks are not sent to broker, so real services stay untouched
+        """
+        with override_settings(CACHES=BENCHMARK_CACHES), \
+                patch.object(Task, 'apply_async'):
+            setup_test_environment()
+            old_config = setup_databases(verbosity=0, interactive=False)
+
+            try:
+                results = self.benchmark(options)
+            except AssertionError as exc:
+                raise CommandError(exc)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+                teardown_test_environment()
+
+        self.report(results)
+
+        if options['update_baseline']:
+            benchmark.save_baseline(options['baseline'], volumes, vendor,
+                                    results)
+            self.stdout.write(f'Baseline stored in {options["baseline"]}')
+            return
+
+        regressions = benchmark.compare(results, baseline,
+                                        options['latency_tolerance'],
+                                        options['memory_tolerance'])
+        if regressions:
+            raise CommandError(
+                'Regressions against baseline:\n' + '\n'.join(regressions))
+
+        self.stdout.write(
+            self.style.SUCCESS('No regressions against baseline'))
@@ -0,0 +1,72 @@
+"""
+Command to compare request latency with and without persistent connections.
+"""
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_started, request_finished
+from django.db import connections
+
+from core.models import Restaurant
+
+
+class Command(BaseCommand):
+    """Benchmark database connection handling command."""
+    help = 'Compare per-request latency with new and persistent connections'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=100)
+        parser.add_argument(
+            '--max-age',
+            type=int,
+            default=60,
+            help='CONN_MAX_AGE used for persistent connections')
+
+    def configure(self, max_age, health_checks):
+        for conn in connections.all():
+            conn.close()
+            conn.settings_dict['CONN_MAX_AGE'] = max_age
+            conn.settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+
+    def request(self):
+        """Emulate request cycle which opens and releases connections"""
+        request_started.send(sender=self.__class__)
+        Restaurant.objects.first()
+        request_finished.send(sender=self.__class__)
+
+    def measure(self, name, runs):
+        timings = []
+
+        for _ in range(runs):
+            start = time.perf_counter()
+            self.request()
+            timings.append((time.perf_counter() - start) * 1000)
+
+        p50 = statistics.median(timings)
+        p95 = statistics.quantiles(timings, n=20)[-1] \
+            if len(timings) > 1 else timings[0]
+        self.stdout.write(
+            f'{name:<24} mean {statistics.mean(timings):8.2f} ms  '
+            f'p50 {p50:8.2f} ms  p95 {p95:8.2f} ms')
+
+    def handle(self, *args, **options):
+        """Entrypoint"""
+        saved = {conn.alias: dict(conn.settings_dict)
+                 for conn in connections.all()}
+        runs = options['runs']
+
+        try:
+            self.configure(0, False)
+            self.measure('new connection', runs)
+
+            self.configure(options['max_age'], False)
+            self.measure('persistent', runs)
+
+            self.configure(options['max_age'], True)
+            self.measure('persistent with checks', runs)
+        finally:
+            for conn in connections.all():
+                conn.close()
+                conn.settings_dict.update(saved[conn.alias])
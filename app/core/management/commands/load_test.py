@@ -0,0 +1,88 @@
+"""
+Command to compare throughput of deployments at fixed concurrency.
+"""
+
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """Load test command."""
+    help = 'Compare throughput of WSGI and ASGI deployments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            action='append',
+            required=True,
+            help='name=url, e.g. asgi=http://localhost:8001/api/async/'
+                 'restaurants/, can be given several times')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--token', help='Bearer token for order paths')
+        parser.add_argument('--timeout', type=float, default=30)
+
+    async def worker(self, client, url, queue, timings, errors):
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            start = time.perf_counter()
+            try:
+                res = await client.get(url)
+                if res.status_code != 200:
+                    errors.append(res.status_code)
+            except httpx.HTTPError as exc:
+                errors.append(type(exc).__name__)
+            timings.append((time.perf_counter() - start) * 1000)
+
+    async def run(self, url, options):
+        """Send requests to url keeping fixed number of them in flight"""
+        queue = asyncio.Queue()
+        for _ in range(options['requests']):
+            queue.put_nowait(None)
+
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Bearer {options["token"]}'
+
+        timings, errors = [], []
+        limits = httpx.Limits(max_connections=options['concurrency'])
+
+        async with httpx.AsyncClient(headers=headers,
+                                     limits=limits,
+                                     timeout=options['timeout']) as client:
+            start = time.perf_counter()
+            await asyncio.gather(*(
+                self.worker(client, url, queue, timings, errors)
+                for _ in range(options['concurrency'])))
+            elapsed = time.perf_counter() - start
+
+        return timings, errors, elapsed
+
+    def handle(self, *args, **options):
+        """Entrypoint"""
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep:
+                raise CommandError(f'Target should be name=url: {target}')
+            targets.append((name, url))
+
+        for name, url in targets:
+            timings, errors, elapsed = asyncio.run(self.run(url, options))
+
+            p50 = statistics.median(timings)
+            p95 = statistics.quantiles(timings, n=20)[-1] \
+                if len(timings) > 1 else timings[0]
+            self.stdout.write(
+                f'{name:<8} {len(timings) / elapsed:8.1f} req/s  '
+                f'p50 {p50:8.2f} ms  p95 {p95:8.2f} ms  '
+                f'errors {len(errors)}')
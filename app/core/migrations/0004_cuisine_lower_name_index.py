@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:23
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_order_ordermeal_orderdrink'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cuisine',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='core_cuisine_lower_name_idx'),
+        ),
+    ]
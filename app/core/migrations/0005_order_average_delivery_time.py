@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_cuisine_lower_name_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='average_delivery_time',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_order_average_delivery_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryTimeMatrix',
+            fields=[
+                ('restaurant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='core.restaurant')),
+                ('origin', models.CharField(max_length=255)),
+                ('durations', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+def deduplicate_slugs(apps, schema_editor):
+    """Add number suffix to repeated slugs before they become unique"""
+    Restaurant = apps.get_model('core', 'Restaurant')
+    taken = set()
+
+    for restaurant in Restaurant.objects.order_by('id'):
+        slug = base = restaurant.slug
+        number = 2
+
+        while slug in taken:
+            slug = f'{base}-{number}'
+            number += 1
+
+        taken.add(slug)
+        if slug != restaurant.slug:
+            restaurant.slug = slug
+            restaurant.save(update_fields=['slug'])
+
+
+def merge_menus(apps, schema_editor):
+    """Keep the first menu of restaurant with items of all its menus"""
+    Menu = apps.get_model('core', 'Menu')
+    kept = {}
+
+    for menu in Menu.objects.order_by('id'):
+        first = kept.setdefault(menu.restaurant_id, menu)
+
+        if first.id != menu.id:
+            first.meals.add(*menu.meals.all())
+            first.drinks.add(*menu.drinks.all())
+            menu.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_deliverytimematrix'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_slugs, migrations.RunPython.noop),
+        migrations.RunPython(merge_menus, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_deduplicate_slugs_and_menus'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='menu',
+            name='restaurant',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='core.restaurant'),
+        ),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=255, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', '-order_time', '-id'], name='core_order_user_time_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+TOP_ITEMS = 3
+CHUNK_SIZE = 500
+
+
+def fill_summary(order):
+    items = [(item.meal.name, item.quantity)
+             for item in order.ordermeal_set.all()]
+    items += [(item.drink.name, item.quantity)
+              for item in order.orderdrink_set.all()]
+    items.sort(key=lambda item: item[1], reverse=True)
+
+    top_items = ', '.join(f'{quantity}x {name.capitalize()}'
+                          for name, quantity in items[:TOP_ITEMS])
+    if len(top_items) > 255:
+        top_items = top_items[:252] + '...'
+
+    order.restaurant_name = order.restaurant.name.capitalize()
+    order.item_count = sum(quantity for _, quantity in items)
+    order.top_items = top_items
+    order.save(update_fields=['restaurant_name', 'item_count', 'top_items'])
+
+
+def fill_order_summary(apps, schema_editor):
+    """Fill summary of orders created before it was stored"""
+    Order = apps.get_model('core', 'Order')
+    orders = Order.objects.select_related('restaurant').prefetch_related(
+        'ordermeal_set__meal', 'orderdrink_set__drink')
+    ids = list(Order.objects.order_by('id').values_list('id', flat=True))
+
+    """Prefetching is ignored by iterator(), go through id chunks"""
+    for start in range(0, len(ids), CHUNK_SIZE):
+        for order in orders.filter(id__in=ids[start:start + CHUNK_SIZE]):
+            fill_summary(order)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_restaurant_slug_menu_restaurant_unique_order_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='restaurant_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='top_items',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(fill_order_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:54
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def fill_line_totals(apps, schema_editor):
+    """Price existing lines with current menu prices, in one update each"""
+    for line_name, data_name in (('OrderMeal', 'Meal'),
+                                 ('OrderDrink', 'Drink')):
+        Line = apps.get_model('core', line_name)
+        Item = apps.get_model('core', data_name)
+        price = Item.objects.filter(pk=OuterRef(f'{data_name.lower()}_id'))\
+            .values('price')[:1]
+
+        Line.objects.update(line_total=Subquery(price) * F('quantity'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_order_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderdrink',
+            name='line_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='ordermeal',
+            name='line_total',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=10),
+        ),
+        migrations.RunPython(fill_line_totals, migrations.RunPython.noop),
+    ]
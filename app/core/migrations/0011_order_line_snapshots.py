@@ -0,0 +1,63 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:56
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Concat, Lower, Substr, Upper
+
+
+def fill_line_snapshots(apps, schema_editor):
+    """
+    Take unit price from line total stored in 0010 and name the way
+    str() of meal or drink shows it, in few updates per line table
+    """
+    for line_name, data_name in (('OrderMeal', 'Meal'),
+                                 ('OrderDrink', 'Drink')):
+        Line = apps.get_model('core', line_name)
+        Item = apps.get_model('core', data_name)
+        items = Item.objects.filter(pk=OuterRef(f'{data_name.lower()}_id'))
+        name = items.annotate(capitalized=Concat(
+            Upper(Substr('name', 1, 1)),
+            Lower(Substr('name', 2)),
+            output_field=models.CharField())).values('capitalized')[:1]
+
+        Line.objects.filter(quantity__gt=0).update(
+            unit_price=F('line_total') / F('quantity'),
+            name=Subquery(name))
+        Line.objects.filter(quantity=0).update(
+            unit_price=Subquery(items.values('price')[:1]),
+            name=Subquery(name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_order_line_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderdrink',
+            name='name',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='orderdrink',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=5),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='ordermeal',
+            name='name',
+            field=models.CharField(default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='ordermeal',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=5),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_line_snapshots, migrations.RunPython.noop),
+    ]
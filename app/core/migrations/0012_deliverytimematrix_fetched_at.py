@@ -0,0 +1,38 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:10
+
+from django.db import migrations, models
+
+
+def fill_fetched_at(apps, schema_editor):
+    """
+    Date known durations by their row and drop failed lookups, so next
+    refresh fetches them again
+    """
+    DeliveryTimeMatrix = apps.get_model('core', 'DeliveryTimeMatrix')
+
+    for matrix in DeliveryTimeMatrix.objects.iterator():
+        fetched_at = matrix.updated_at.timestamp()
+        matrix.durations = {
+            district: duration
+            for district, duration in matrix.durations.items()
+            if duration is not None}
+        matrix.fetched_at = {
+            district: fetched_at for district in matrix.durations}
+        DeliveryTimeMatrix.objects.filter(pk=matrix.pk).update(
+            durations=matrix.durations, fetched_at=matrix.fetched_at)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_order_line_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliverytimematrix',
+            name='fetched_at',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.RunPython(fill_fetched_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.0.10 on 2026-10-18 21:40
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_delivery_price(apps, schema_editor):
+    """Existing orders take current delivery price of their restaurant"""
+    Order = apps.get_model('core', 'Order')
+    Restaurant = apps.get_model('core', 'Restaurant')
+    price = Restaurant.objects.filter(pk=OuterRef('restaurant_id'))\
+        .values('delivery_price')[:1]
+
+    Order.objects.update(delivery_price=Subquery(price))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_deliverytimematrix_fetched_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='delivery_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=5),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_delivery_price, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+import re
+
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Lower
 from django.utils.text import slugify
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -8,6 +11,10 @@ from django.contrib.auth.models import (
 
 from decimal import Decimal
 
+from . import pricing
+
+SLUG_ATTEMPTS = 3
+
 
 class UserManager(BaseUserManager):
     """Modify creating a new user or superuser"""
@@ -49,13 +56,18 @@ class User(AbstractBaseUser, PermissionsMixin):
 class Cuisine(models.Model):
     name = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            models.Index(Lower('name'), name='core_cuisine_lower_name_idx'),
+        ]
+
     def __str__(self):
         return self.name.capitalize()
 
 
 class Restaurant(models.Model):
     name = models.CharField(max_length=255)
-    slug = models.SlugField(max_length=255, blank=True)
+    slug = models.SlugField(max_length=255, blank=True, unique=True)
     city = models.CharField(max_length=255)
     address = models.CharField(max_length=255)
     post_code = models.CharField(max_length=7)
@@ -67,8 +79,41 @@ class Restaurant(models.Model):
         return self.name.capitalize()
 
     def save(self, *args, **kwargs):
-        self.slug = slugify(self.name)
-        super().save(*args, **kwargs)
+        if self.slug_fits_name():
+            super().save(*args, **kwargs)
+            return
+
+        """Concurrent save can take the same slug first, next one is picked"""
+        for attempt in range(SLUG_ATTEMPTS):
+            self.slug = self.unique_slug()
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                if attempt == SLUG_ATTEMPTS - 1:
+                    raise
+
+    def slug_fits_name(self):
+        """Slug has to be made again only for new or renamed restaurant"""
+        base = slugify(self.name)
+        return bool(self.slug) and (
+            self.slug == base or
+            re.fullmatch(rf'{re.escape(base)}-\d+', self.slug) is not None)
+
+    def unique_slug(self):
+        """Slug from name with number suffix when it is already taken"""
+        slug = base = slugify(self.name)
+        taken = set(Restaurant.objects.exclude(pk=self.pk)
+                    .filter(slug__startswith=base)
+                    .values_list('slug', flat=True))
+        number = 2
+
+        while slug in taken:
+            slug = f'{base}-{number}'
+            number += 1
+
+        return slug
 
 
 class Tag(models.Model):
@@ -106,7 +151,7 @@ class Drink(models.Model):
 
 
 class Menu(models.Model):
-    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    restaurant = models.OneToOneField(Restaurant, on_delete=models.CASCADE)
     meals = models.ManyToManyField(Meal)
     drinks = models.ManyToManyField(Drink)
 
@@ -123,16 +168,36 @@ class Order(models.Model):
     delivery_phone = models.CharField(max_length=17, blank=False)
     order_time = models.DateTimeField(auto_now_add=True)
     total_price = models.DecimalField(
-        max_digits=5,
+        max_digits=10,
         decimal_places=2,
         default=(Decimal(0))
     )
+    delivery_price = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        editable=False
+    )
+    average_delivery_time = models.CharField(max_length=255, blank=True)
+    restaurant_name = models.CharField(max_length=255, blank=True)
+    item_count = models.PositiveIntegerField(default=0)
+    top_items = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-order_time', '-id'],
+                         name='core_order_user_time_idx'),
+        ]
 
     def __str__(self):
         return f'Order {self.user}-{self.id} from {self.restaurant}'
 
     def save(self, *args, **kwargs):
-        self.total_price += Decimal(self.restaurant.delivery_price)
+        if not self.restaurant_name:
+            self.restaurant_name = str(self.restaurant)
+        """Delivery price is kept from the moment order was placed"""
+        if self.delivery_price is None:
+            self.delivery_price = pricing.to_money(
+                self.restaurant.delivery_price)
         super().save(*args, **kwargs)
 
 
@@ -140,10 +205,30 @@ class OrderDrink(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     drink = models.ForeignKey(Drink, on_delete=models.CASCADE)
     quantity = models.PositiveSmallIntegerField(default=1)
+    name = models.CharField(max_length=255, editable=False)
+    unit_price = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        editable=False
+    )
+    line_total = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        editable=False
+    )
 
     @property
     def get_total_drink_price(self):
-        return Decimal(self.drink.price * self.quantity)
+        return self.line_total
+
+    def save(self, *args, **kwargs):
+        """Drink name and price are kept from the moment line was created"""
+        if self.unit_price is None:
+            self.unit_price = pricing.to_money(self.drink.price)
+        if not self.name:
+            self.name = str(self.drink)
+        self.line_total = pricing.line_total(self.unit_price, self.quantity)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f'Order-{self.order.id}, drink-{self.drink.id}'
@@ -153,10 +238,47 @@ class OrderMeal(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
     meal = models.ForeignKey(Meal, on_delete=models.CASCADE)
     quantity = models.PositiveSmallIntegerField(default=1)
+    name = models.CharField(max_length=255, editable=False)
+    unit_price = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        editable=False
+    )
+    line_total = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        editable=False
+    )
 
     @property
     def get_total_meal_price(self):
-        return Decimal(self.meal.price * self.quantity)
+        return self.line_total
+
+    def save(self, *args, **kwargs):
+        """Meal name and price are kept from the moment line was created"""
+        if self.unit_price is None:
+            self.unit_price = pricing.to_money(self.meal.price)
+        if not self.name:
+            self.name = str(self.meal)
+        self.line_total = pricing.line_total(self.unit_price, self.quantity)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f'Order-{self.order.id}, drink-{self.meal.id}'
+
+
+class DeliveryTimeMatrix(models.Model):
+    """Precomputed delivery durations from restaurant to Warsaw districts"""
+    restaurant = models.OneToOneField(
+        Restaurant,
+        on_delete=models.CASCADE,
+        primary_key=True
+    )
+    origin = models.CharField(max_length=255)
+    durations = models.JSONField(default=dict)
+    """District to timestamp its duration was fetched at"""
+    fetched_at = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.restaurant.name} delivery times'
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+from rest_framework.pagination import CursorPagination
+
+from django.conf import settings
+
+
+class RestaurantCursorPagination(CursorPagination):
+    """Keyset pagination of restaurants by id"""
+    ordering = 'id'
+    page_size = settings.RESTAURANTS_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class OrderCursorPagination(CursorPagination):
+    """Keyset pagination of orders from the newest one"""
+    ordering = ('-order_time', '-id')
+    page_size = settings.ORDERS_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+"""
+Keyset pages of async views, DRF pagination runs queries synchronously.
+Page holds objects after cursor given in ?after= and link to next page.
+"""
+
+
+def keyset_page_size(request, default):
+    """Requested page size bounded like in cursor pagination"""
+    try:
+        page_size = int(request.GET.get('page_size', default))
+    except ValueError:
+        page_size = default
+
+    return min(max(page_size, 1), settings.MAX_PAGE_SIZE)
+
+
+def keyset_page(request, objects, page_size, cursor):
+    """
+    Return objects of page and url of next one, objects are loaded with
+    one more than page size to know whether next page exists
+    """
+    if len(objects) <= page_size:
+        return objects, None
+
+    query = request.GET.copy()
+    query['after'] = cursor(objects[page_size - 1])
+    return objects[:page_size], request.build_absolute_uri(
+        f'{request.path}?{query.urlencode()}')
+
+
+def order_cursor(order):
+    return f'{order.order_time.isoformat()}_{order.id}'
+
+
+def parse_order_cursor(value):
+    """Return (order_time, id) of order cursor, raise ValueError if invalid"""
+    order_time, _, order_id = value.rpartition('_')
+    order_time = datetime.fromisoformat(order_time)
+
+    if order_time.tzinfo is None:
+        raise ValueError(f'Cursor time without timezone: {value}')
+
+    return order_time, int(order_id)
@@ -0,0 +1,57 @@
+"""
+Exact Decimal pricing of orders.
+"""
+
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Sum
+
+CENT = Decimal('0.01')
+
+Line = namedtuple('Line', ('unit_price', 'total'))
+OrderPrice = namedtuple(
+    'OrderPrice',
+    ('meal_lines', 'drink_lines', 'subtotal', 'delivery', 'total'))
+
+
+def to_money(value):
+    """Decimal rounded to cents, floats are taken by their shortest repr"""
+    if isinstance(value, float):
+        value = repr(value)
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def line_total(price, quantity):
+    return to_money(price) * quantity
+
+
+def price_order(meals, drinks, delivery_price):
+    """
+    Price order from already loaded objects in one pass over its lines,
+    meals and drinks are lists of {'meal' or 'drink': obj, 'quantity': n}
+    """
+    subtotal = Decimal(0)
+    priced = {'meal': [], 'drink': []}
+
+    for data_name, lines in (('meal', meals), ('drink', drinks)):
+        for data in lines:
+            unit_price = to_money(data[data_name].price)
+            total = unit_price * data['quantity']
+            priced[data_name].append(Line(unit_price, total))
+            subtotal += total
+
+    delivery = to_money(delivery_price)
+    return OrderPrice(priced['meal'], priced['drink'],
+                      subtotal, delivery, subtotal + delivery)
+
+
+def reprice_order(order):
+    """Recount total of stored order from its line totals"""
+    subtotal = Decimal(0)
+
+    for lines in (order.ordermeal_set, order.orderdrink_set):
+        subtotal += lines.aggregate(total=Sum('line_total'))['total'] or 0
+
+    order.total_price = subtotal + order.delivery_price
+    order.save(update_fields=['total_price'])
@@ -1,7 +1,12 @@
+from decimal import Decimal
+
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from core import models
+from core.pricing import reprice_order
+
 
 class AdminSiteTests(TestCase):
 
@@ -46,3 +51,115 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+
+class OrderAdminTests(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(get_user_model().objects.create_superuser(
+            email='admin@test.com',
+            password='testadminpassword'
+        ))
+        self.restaurant = models.Restaurant.objects.create(
+            name='testname',
+            city='Warsaw',
+            address='testaddress',
+            post_code='01-111',
+            phone='testphone',
+            cuisine=models.Cuisine.objects.create(name='testcuisine'),
+            delivery_price=7.50
+        )
+        tag = models.Tag.objects.create(name='tag')
+        self.meal = models.Meal.objects.create(
+            name='meal', price=10.00, description='d', tag=tag)
+        self.order = models.Order.objects.create(
+            user=get_user_model().objects.create_user(
+                email='test@test.com', name='test', password='testpass'),
+            restaurant=self.restaurant,
+            delivery_address='test address',
+            delivery_city='Warsaw',
+            delivery_post_code='00-000',
+            delivery_phone='00000000000'
+        )
+        self.line = models.OrderMeal.objects.create(
+            order=self.order, meal=self.meal, quantity=2)
+        reprice_order(self.order)
+
+        """Prices change after order was placed"""
+        self.meal.price = 99.00
+        self.meal.save()
+        self.restaurant.delivery_price = 20.00
+        self.restaurant.save()
+
+    def change_order(self, quantity, address='test address', meal=None):
+        order = self.order
+        return self.client.post(
+            reverse('admin:core_order_change', args=[order.id]), {
+                'user': order.user_id,
+                'restaurant': order.restaurant_id,
+                'delivery_address': address,
+                'delivery_city': order.delivery_city,
+                'delivery_post_code': order.delivery_post_code,
+                'delivery_phone': order.delivery_phone,
+                'average_delivery_time': '',
+                'restaurant_name': order.restaurant_name,
+                'item_count': order.item_count,
+                'top_items': '',
+                'ordermeal_set-TOTAL_FORMS': 1,
+                'ordermeal_set-INITIAL_FORMS': 1,
+                'ordermeal_set-0-id': self.line.id,
+                'ordermeal_set-0-order': order.id,
+                'ordermeal_set-0-meal': (meal or self.meal).id,
+                'ordermeal_set-0-quantity': quantity,
+                'orderdrink_set-TOTAL_FORMS': 0,
+                'orderdrink_set-INITIAL_FORMS': 0,
+            })
+
+    def test_order_change_keeps_total(self):
+        """Editing order without its items keeps historical total"""
+        res = self.change_order(quantity=2, address='new address')
+
+        self.assertEqual(res.status_code, 302)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.delivery_address, 'new address')
+        self.assertEqual(self.order.total_price, Decimal('27.50'))
+
+    def test_order_items_change_reprices_with_kept_delivery(self):
+        """Changed quantity keeps unit and delivery prices of order"""
+        res = self.change_order(quantity=3)
+
+        self.assertEqual(res.status_code, 302)
+        self.line.refresh_from_db()
+        self.assertEqual(self.line.unit_price, Decimal('10.00'))
+        self.assertEqual(self.line.line_total, Decimal('30.00'))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.delivery_price, Decimal('7.50'))
+        self.assertEqual(self.order.total_price, Decimal('37.50'))
+
+    def test_order_item_replaced_takes_current_price(self):
+        meal = models.Meal.objects.create(
+            name='othermeal', price=5.00, description='d',
+            tag=self.meal.tag)
+
+        res = self.change_order(quantity=2, meal=meal)
+
+        self.assertEqual(res.status_code, 302)
+        self.line.refresh_from_db()
+        self.assertEqual(self.line.name, 'Othermeal')
+        self.assertEqual(self.line.unit_price, Decimal('5.00'))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, Decimal('17.50'))
+
+    def test_order_items_change_updates_summary(self):
+        drink = models.Drink.objects.create(
+            name='drink', price=2.50, tag=self.meal.tag)
+        models.OrderDrink.objects.create(
+            order=self.order, drink=drink, quantity=1)
+
+        res = self.change_order(quantity=3)
+
+        self.assertEqual(res.status_code, 302)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.item_count, 4)
+        self.assertEqual(self.order.top_items, '3x Meal, 1x Drink')
@@ -0,0 +1,168 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import benchmark, models
+from orders.tasks import estimate_delivery_time
+
+
+class BenchmarkTests(TestCase):
+
+    def test_all_endpoints_are_benchmarked(self):
+        self.assertEqual(benchmark.uncovered_endpoints(), [])
+
+    def test_seed(self):
+        data = benchmark.seed(restaurants=3, menu_items=8, users=2, orders=4)
+
+        self.assertEqual(models.Restaurant.objects.count(), 3)
+        self.assertEqual(data.restaurant.menu.meals.count(), 8)
+        self.assertEqual(data.restaurant.menu.drinks.count(), 2)
+        self.assertEqual(models.Order.objects.filter(user=data.user).count(),
+                         4)
+        self.assertEqual(models.OrderMeal.objects.count(), 16)
+        self.assertEqual(data.order.total_price, sum(
+            line.line_total for line in data.order.ordermeal_set.all()
+        ) + sum(
+            line.line_total for line in data.order.orderdrink_set.all()
+        ) + data.restaurant.delivery_price)
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.MD5PasswordHasher'])
+    @patch.dict('os.environ', {
+        'GRANT_TYPE1': 'password',
+        'GRANT_TYPE2': 'refresh_token',
+        'CLIENT_ID': 'test-client-id',
+        'CLIENT_SECRET': 'test-client-secret'
+    })
+    def test_run_benchmarks_for_every_endpoint(self):
+        data = benchmark.seed(restaurants=2, menu_items=4, users=1, orders=2)
+
+        results = benchmark.run_benchmarks(data, runs=2)
+
+        self.assertEqual(set(results),
+                         {endpoint.name for endpoint in benchmark.ENDPOINTS})
+        self.assertEqual(results['health-check'].queries, 0)
+        for result in results.values():
+            self.assertLessEqual(result.p50, result.p95)
+            self.assertGreater(result.peak_kib, 0)
+
+    def test_run_benchmarks_fails_on_unexpected_status(self):
+        data = benchmark.seed(restaurants=1, menu_items=4, users=1, orders=1)
+
+        with self.assertRaisesRegex(AssertionError, 'responded with 401'):
+            benchmark.run_benchmarks(
+                data._replace(token='wrong'), runs=1,
+                names=['orders:order-list'])
+
+
+@patch('core.management.commands.benchmark_api.teardown_test_environment')
+@patch('core.management.commands.benchmark_api.teardown_databases')
+@patch('core.management.commands.benchmark_api.setup_databases')
+@patch('core.management.commands.benchmark_api.setup_test_environment')
+class BenchmarkCommandTests(SimpleTestCase):
+
+    def test_missing_baseline_fails(self, *patched):
+        with self.assertRaisesRegex(CommandError, 'No baseline'):
+            call_command('benchmark_api', baseline='/nonexistent.json')
+
+        patched[0].assert_not_called()
+
+    def store_baseline(self, directory, **baseline):
+        path = os.path.join(directory, 'baseline.json')
+        values = {'volumes': {'restaurants': 2000, 'menu_items': 120,
+                              'users': 50, 'orders': 300},
+                  'vendor': connection.vendor, 'endpoints': {}}
+        values.update(baseline)
+        with open(path, 'w') as stream:
+            json.dump(values, stream)
+        return path
+
+    def test_other_volumes_fail_before_seeding(self, *patched):
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.store_baseline(directory)
+
+            with self.assertRaisesRegex(CommandError, 'not on'):
+                call_command('benchmark_api', baseline=path, restaurants=10)
+
+        patched[0].assert_not_called()
+
+    def test_other_vendor_fails_before_seeding(self, *patched):
+        with tempfile.TemporaryDirectory() as directory:
+            path = self.store_baseline(directory, vendor='oracle')
+
+            with self.assertRaisesRegex(CommandError, 'oracle database'):
+                call_command('benchmark_api', baseline=path)
+
+        patched[0].assert_not_called()
+
+    def test_benchmark_leaves_cache_and_broker_alone(self, *patched):
+        def run(options):
+            """Cache is local and tasks are not sent while measuring"""
+            self.assertEqual(
+                settings.CACHES['default']['BACKEND'],
+                'django.core.cache.backends.locmem.LocMemCache')
+            estimate_delivery_time.delay(1)
+            estimate_delivery_time.apply_async.assert_called_once()
+            return {}
+
+        with tempfile.TemporaryDirectory() as directory, \
+                patch('core.management.commands.benchmark_api.Command'
+                      '.benchmark', side_effect=run) as patched_benchmark:
+            path = os.path.join(directory, 'baseline.json')
+            call_command('benchmark_api', baseline=path,
+                         update_baseline=True, stdout=StringIO())
+
+            patched_benchmark.assert_called_once()
+            baseline = benchmark.load_baseline(path)
+            self.assertEqual(baseline['volumes']['restaurants'], 2000)
+            self.assertEqual(baseline['vendor'], connection.vendor)
+
+
+class CompareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.baseline = {'endpoints': {
+            'orders:order-list': {
+                'queries': 2, 'p50': 10.0, 'p95': 20.0, 'peak_kib': 200.0},
+        }}
+
+    def compare(self, **result):
+        values = {'queries': 2, 'p50': 10.0, 'p95': 20.0, 'peak_kib': 200.0}
+        values.update(result)
+        return benchmark.compare(
+            {'orders:order-list': benchmark.Result(**values)},
+            self.baseline, 0.5, 0.2)
+
+    def test_compare_within_tolerance(self):
+        self.assertEqual(self.compare(p95=29.0, peak_kib=235.0), [])
+
+    def test_compare_reports_more_queries(self):
+        self.assertEqual(self.compare(queries=3),
+                         ['orders:order-list: 3 queries, baseline 2'])
+
+    def test_compare_reports_slower_and_bigger(self):
+        regressions = self.compare(p95=31.0, peak_kib=300.0)
+
+        self.assertEqual(len(regressions), 2)
+        self.assertIn('p95 31.00 ms', regressions[0])
+        self.assertIn('peak 300.0 KiB', regressions[1])
+
+    def test_compare_ignores_noise_of_fast_endpoints(self):
+        self.baseline['endpoints']['orders:order-list'].update(
+            p95=1.0, peak_kib=10.0)
+
+        self.assertEqual(self.compare(p95=2.5, peak_kib=30.0), [])
+
+    def test_compare_reports_endpoints_without_baseline(self):
+        self.baseline['endpoints'] = {}
+
+        self.assertEqual(self.compare(),
+                         ['orders:order-list: missing in baseline'])
@@ -0,0 +1,66 @@
+from unittest.mock import patch, MagicMock
+
+from django.db import connection
+from django.test import TestCase
+
+from core import db
+
+from app.celery import check_database_connections
+
+
+@patch.object(db, 'NATIVE_HEALTH_CHECKS', False)
+class ConnectionHealthCheckTests(TestCase):
+
+    def setUp(self):
+        connection.ensure_connection()
+        patcher = patch.dict(connection.settings_dict,
+                             {'CONN_HEALTH_CHECKS': True})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unusable_connection_is_closed(self):
+        with patch.object(connection, 'is_usable', return_value=False), \
+                patch.object(connection, 'close') as patched_close:
+            db.close_unusable_connections()
+
+        patched_close.assert_called_once()
+
+    def test_usable_connection_is_kept(self):
+        with patch.object(connection, 'is_usable', return_value=True), \
+                patch.object(connection, 'close') as patched_close:
+            db.close_unusable_connections()
+
+        patched_close.assert_not_called()
+
+    def test_connection_is_not_checked_without_health_checks(self):
+        connection.settings_dict['CONN_HEALTH_CHECKS'] = False
+
+        with patch.object(connection, 'is_usable') as patched_usable:
+            db.close_unusable_connections()
+
+        patched_usable.assert_not_called()
+
+    def test_connections_are_checked_on_request(self):
+        with patch.object(connection, 'is_usable',
+                          return_value=True) as patched_usable:
+            self.client.get('/')
+
+        patched_usable.assert_called()
+
+    def test_worker_checks_connections_before_task(self):
+        task = MagicMock()
+        task.request.is_eager = False
+
+        with patch('core.db.close_unusable_connections') as patched_check:
+            check_database_connections(sender=task)
+
+        patched_check.assert_called_once()
+
+    def test_eager_task_does_not_check_connections(self):
+        task = MagicMock()
+        task.request.is_eager = True
+
+        with patch('core.db.close_unusable_connections') as patched_check:
+            check_database_connections(sender=task)
+
+        patched_check.assert_not_called()
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models.functions import Lower
+from django.test import TestCase
+
+from core import models
+
+
+class IndexUsageTests(TestCase):
+    """Hot lookups should be served by index scans on every database"""
+
+    def setUp(self):
+        cuisine = models.Cuisine.objects.create(name='testcuisine')
+        self.restaurant = models.Restaurant.objects.create(
+            name='testname',
+            city='Warsaw',
+            address='testaddress',
+            post_code='01-111',
+            phone='testphone',
+            cuisine=cuisine,
+            delivery_price=7.50
+        )
+        models.Menu.objects.create(restaurant=self.restaurant)
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='testpass',
+            name='testname'
+        )
+
+        """Tables are tiny, make planner choose index whenever it can"""
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index):
+        """
+        Index is name of named index, or column of unique constraint
+        which index name differs between databases
+        """
+        plan = queryset.explain()
+        self.assertIn('INDEX', plan.upper())
+        self.assertIn(index, plan)
+        self.assertNotIn('Seq Scan', plan)
+        self.assertNotIn(f'SCAN {queryset.model._meta.db_table}', plan)
+
+    def test_restaurant_slug_lookup(self):
+        self.assertUsesIndex(
+            models.Restaurant.objects.filter(slug='testname'), 'slug')
+
+    def test_cuisine_lower_name_lookup(self):
+        self.assertUsesIndex(
+            models.Cuisine.objects.alias(lower_name=Lower('name'))
+            .filter(lower_name='testcuisine'),
+            'core_cuisine_lower_name_idx')
+
+    def test_menu_restaurant_lookup(self):
+        self.assertUsesIndex(
+            models.Menu.objects.filter(restaurant=self.restaurant),
+            'restaurant_id')
+
+    def test_user_orders_ordered_by_time(self):
+        self.assertUsesIndex(
+            models.Order.objects.filter(user=self.user)
+            .order_by('-order_time', '-id'),
+            'core_order_user_time_idx')
@@ -1,4 +1,9 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
@@ -101,6 +106,69 @@ class ModelTests(TestCase):
         for key in params.keys():
             self.assertEqual(params[key], getattr(restaurant, key))
 
+    def test_restaurant_slug_is_unique(self):
+        params = {
+            'name': 'Test Name',
+            'city': 'Warsaw',
+            'address': 'testaddress',
+            'post_code': '01-111',
+            'phone': 'testphone',
+            'cuisine': sample_cuisine('testcuisine'),
+            'delivery_price': 7.50
+        }
+
+        first = sample_restaurant(**params)
+        second = sample_restaurant(**params)
+        third = sample_restaurant(**params)
+        first.save()
+
+        self.assertEqual(first.slug, 'test-name')
+        self.assertEqual(second.slug, 'test-name-2')
+        self.assertEqual(third.slug, 'test-name-3')
+
+    def test_restaurant_slug_is_kept_when_name_does_not_change(self):
+        restaurant = sample_restaurant(
+            name='Test Name',
+            city='Warsaw',
+            address='testaddress',
+            post_code='01-111',
+            phone='testphone',
+            cuisine=sample_cuisine('testcuisine'),
+            delivery_price=7.50
+        )
+        restaurant.city = 'Cracow'
+
+        with CaptureQueriesContext(connection) as queries:
+            restaurant.save()
+
+        self.assertFalse(any('LIKE' in query['sql']
+                             for query in queries.captured_queries))
+        self.assertEqual(restaurant.slug, 'test-name')
+
+        restaurant.name = 'Other Name'
+        restaurant.save()
+        self.assertEqual(restaurant.slug, 'other-name')
+
+    def test_restaurant_slug_taken_concurrently_is_retried(self):
+        params = {
+            'name': 'Test Name',
+            'city': 'Warsaw',
+            'address': 'testaddress',
+            'post_code': '01-111',
+            'phone': 'testphone',
+            'cuisine': sample_cuisine('testcuisine'),
+            'delivery_price': 7.50
+        }
+        sample_restaurant(**params)
+
+        """Other process took the slug after it was picked"""
+        with patch.object(models.Restaurant, 'unique_slug',
+                          side_effect=['test-name', 'test-name-2']):
+            restaurant = sample_restaurant(**params)
+
+        self.assertEqual(restaurant.slug, 'test-name-2')
+        self.assertEqual(models.Restaurant.objects.count(), 2)
+
     def test_tag_model(self):
         name = 'tagname'
 
@@ -274,6 +342,8 @@ class ModelTests(TestCase):
         self.assertEqual(order_meal.meal, meal)
         self.assertEqual(order_meal.quantity, 2)
         self.assertEqual(order_meal.get_total_meal_price, 2)
+        self.assertEqual(order_meal.name, 'Testmeal')
+        self.assertEqual(order_meal.unit_price, Decimal('1.00'))
 
     def test_orderdrink_model(self):
         user_params = {
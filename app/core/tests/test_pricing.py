@@ -0,0 +1,86 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from core import models
+from core.pricing import (Line, to_money, line_total, price_order,
+                          reprice_order)
+
+
+def sample_line(data_name, price, quantity):
+    return {data_name: SimpleNamespace(price=price), 'quantity': quantity}
+
+
+class PricingTests(SimpleTestCase):
+
+    def test_to_money_is_exact_for_floats(self):
+        self.assertEqual(to_money(10.1), Decimal('10.10'))
+        self.assertEqual(to_money(0.1) + to_money(0.2), Decimal('0.30'))
+        self.assertEqual(to_money('2.345'), Decimal('2.35'))
+
+    def test_line_total(self):
+        self.assertEqual(line_total(Decimal('19.99'), 3), Decimal('59.97'))
+
+    def test_price_order(self):
+        price = price_order(
+            [sample_line('meal', Decimal('10.10'), 3),
+             sample_line('meal', Decimal('0.20'), 1)],
+            [sample_line('drink', 2.5, 2)],
+            Decimal('7.50'))
+
+        self.assertEqual(price.meal_lines, [
+            Line(Decimal('10.10'), Decimal('30.30')),
+            Line(Decimal('0.20'), Decimal('0.20'))])
+        self.assertEqual(price.drink_lines,
+                         [Line(Decimal('2.50'), Decimal('5.00'))])
+        self.assertEqual(price.subtotal, Decimal('35.50'))
+        self.assertEqual(price.delivery, Decimal('7.50'))
+        self.assertEqual(price.total, Decimal('43.00'))
+
+    def test_price_order_above_thousand(self):
+        price = price_order(
+            [sample_line('meal', Decimal('999.99'), 100)], [], 12)
+
+        self.assertEqual(price.total, Decimal('100011.00'))
+
+
+class RepriceOrderTests(TestCase):
+
+    def test_reprice_order_from_line_totals(self):
+        restaurant = models.Restaurant.objects.create(
+            name='testname',
+            city='Warsaw',
+            address='testaddress',
+            post_code='01-111',
+            phone='testphone',
+            cuisine=models.Cuisine.objects.create(name='testcuisine'),
+            delivery_price=7.50
+        )
+        tag = models.Tag.objects.create(name='tag')
+        meal = models.Meal.objects.create(
+            name='meal', price=10.00, description='d', tag=tag)
+        drink = models.Drink.objects.create(name='drink', price=2.50, tag=tag)
+        order = models.Order.objects.create(
+            user=get_user_model().objects.create_user(
+                email='test@test.com', name='test', password='testpass'),
+            restaurant=restaurant,
+            delivery_address='test address',
+            delivery_city='Warsaw',
+            delivery_post_code='00-000',
+            delivery_phone='00000000000'
+        )
+        models.OrderMeal.objects.create(order=order, meal=meal, quantity=2)
+        models.OrderDrink.objects.create(order=order, drink=drink, quantity=1)
+
+        """Line and order keep prices they were created with"""
+        meal.price = 99.00
+        meal.save()
+        restaurant.delivery_price = 20.00
+        restaurant.save()
+
+        reprice_order(order)
+
+        order.refresh_from_db()
+        self.assertEqual(order.total_price, Decimal('30.00'))
@@ -1,7 +1,31 @@
+from functools import wraps
+
+from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
+from django.http import JsonResponse
+
 
 @api_view(['GET'])
 def health_check(request):
     return Response({'health': True})
+
+
+def detail_response(detail, status):
+    """Error of async views in the shape DRF responds with"""
+    return JsonResponse({'detail': detail}, status=status)
+
+
+def require_safe_async(view):
+    """Allow only GET and HEAD, decorators of Django 4.1 are sync only"""
+
+    @wraps(view)
+    async def inner(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return detail_response(
+                f'Method "{request.method}" not allowed.',
+                status.HTTP_405_METHOD_NOT_ALLOWED)
+        return await view(request, *args, **kwargs)
+
+    return inner
@@ -0,0 +1,98 @@
+"""
+Creation of many orders with set-based lookups and bulk inserts.
+"""
+
+from django.db import transaction
+
+from core.models import (Order, OrderMeal, OrderDrink, Menu, Meal, Drink,
+                         Restaurant, DeliveryTimeMatrix)
+from core.pricing import price_order
+
+from .distance import format_duration
+from .matrix import matrix_duration
+from .serializers import collect_ids, summarize, order_lines
+from .tasks import estimate_delivery_time
+
+
+def menu_ids(data_name, restaurant_ids, ids):
+    """Return submitted menu objects of every restaurant"""
+    menus = {}
+    rows = Menu.objects.filter(**{
+        'restaurant__in': restaurant_ids,
+        f'{data_name}s__in': ids
+    }).values_list('restaurant_id', f'{data_name}s')
+
+    for restaurant_id, object_id in rows:
+        menus.setdefault(restaurant_id, set()).add(object_id)
+
+    return menus
+
+
+def preload(orders):
+    """Load everything bulk order validation needs in fixed queries"""
+    ids = collect_ids(orders)
+
+    return {
+        Restaurant: Restaurant.objects.in_bulk(ids['restaurant']),
+        Meal: Meal.objects.in_bulk(ids['meal']),
+        Drink: Drink.objects.in_bulk(ids['drink']),
+        'menus': {
+            data_name: menu_ids(data_name, ids['restaurant'], ids[data_name])
+            for data_name in ('meal', 'drink')
+        },
+        'matrices': {
+            restaurant_id: (origin, durations)
+            for restaurant_id, origin, durations in DeliveryTimeMatrix.objects
+            .filter(restaurant_id__in=ids['restaurant'])
+            .values_list('restaurant_id', 'origin', 'durations')
+        },
+    }
+
+
+def build_order(user, data, matrices):
+    """Return unsaved order, bulk insert skips Order.save()"""
+    meals = data.pop('meals')
+    drinks = data.pop('drinks')
+    restaurant = data['restaurant']
+    item_count, top_items = summarize(meals, drinks)
+    duration = matrix_duration(restaurant, matrices.get(restaurant.id),
+                               data['delivery_post_code'])
+
+    price = price_order(meals, drinks, restaurant.delivery_price)
+
+    order = Order(
+        user=user,
+        total_price=price.total,
+        delivery_price=price.delivery,
+        restaurant_name=str(restaurant),
+        item_count=item_count,
+        top_items=top_items,
+        average_delivery_time=format_duration(duration)
+        if duration is not None else '',
+        **data)
+
+    return (order, *order_lines(order, meals, drinks, price))
+
+
+def create_orders(user, validated, preloaded):
+    """Insert orders with their meals and drinks in one transaction"""
+    built = [build_order(user, data, preloaded['matrices'])
+             for data in validated]
+    orders = [order for order, _, _ in built]
+
+    with transaction.atomic():
+        Order.objects.bulk_create(orders)
+        OrderMeal.objects.bulk_create(
+            [line for _, meal_lines, _ in built for line in meal_lines])
+        OrderDrink.objects.bulk_create(
+            [line for _, _, drink_lines in built for line in drink_lines])
+
+        """Estimate delivery time in worker once orders are stored"""
+        pending = [order.id for order in orders
+                   if not order.average_delivery_time]
+        if pending:
+            transaction.on_commit(lambda: [
+                estimate_delivery_time.delay(order_id)
+                for order_id in pending])
+
+    return orders
@@ -0,0 +1,80 @@
+"""
+Cache of travel durations between origin and destination post codes.
+"""
+
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import LocalCache, MISSING, call_cache
+
+DURATION_KEY = 'orders:duration:{0}:{1}'
+LOCK_KEY = 'orders:duration-lock:{0}:{1}'
+
+
+local_cache = LocalCache(
+    maxsize=settings.DISTANCE_LOCAL_CACHE_SIZE,
+    timeout=settings.DISTANCE_CACHE_TIMEOUT)
+
+
+def normalize_post_code(post_code):
+    """Return post code in 00-000 format"""
+    digits = re.sub(r'\D', '', post_code)
+    return f'{digits[:2]}-{digits[2:]}'
+
+
+def wait_for_duration(key):
+    """Wait until other worker stores duration"""
+    deadline = time.monotonic() + settings.DISTANCE_LOCK_TIMEOUT
+
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        duration = call_cache(cache.get, key, MISSING)
+        if duration is not MISSING:
+            return duration
+
+    return MISSING
+
+
+def get_duration(origin_post_code, destination_post_code, fetch):
+    """Return cached duration or fetch it once for all waiting workers"""
+    codes = (normalize_post_code(origin_post_code),
+             normalize_post_code(destination_post_code))
+    key = DURATION_KEY.format(*codes)
+    lock_key = LOCK_KEY.format(*codes)
+
+    duration = local_cache.get(key)
+    if duration is not MISSING:
+        return duration
+
+    duration = call_cache(cache.get, key, MISSING)
+
+    if duration is MISSING:
+        """Only lock owner asks distance service, others wait for it"""
+        is_owner = call_cache(
+            cache.add, lock_key, 1,
+            timeout=settings.DISTANCE_LOCK_TIMEOUT,
+            default=True)
+
+        if not is_owner:
+            duration = wait_for_duration(key)
+
+        if duration is MISSING:
+            try:
+                duration = fetch()
+            except Exception:
+                if is_owner:
+                    call_cache(cache.delete, lock_key)
+                raise
+
+            """Duration is stored before lock is gone, so nobody fetches it
+            again in between"""
+            call_cache(cache.set, key, duration,
+                       timeout=settings.DISTANCE_CACHE_TIMEOUT)
+            if is_owner:
+                call_cache(cache.delete, lock_key)
+
+    local_cache.set(key, duration)
+    return duration
@@ -0,0 +1,62 @@
+"""
+Backends used to estimate travel time between restaurant and order address.
+"""
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+import httpx
+
+
+def format_address(address, city, post_code):
+    return f'{address}, {city} {post_code}, Poland'
+
+
+def format_duration(seconds):
+    return f'{max(round(seconds / 60), 1)} mins'
+
+
+class DistanceMatrixBackend:
+    """Travel durations taken from Distancematrix.ai Matrix API"""
+    url = 'https://api.distancematrix.ai/maps/api/distancematrix/json'
+
+    def get_duration(self, origin, destination):
+        """Return duration in seconds or None if it cannot be calculated"""
+        return self.get_durations(origin, [destination])[0]
+
+    def get_durations(self, origin, destinations):
+        """Return durations to many destinations with one request"""
+        params = {
+            'origins': origin,
+            'destinations': '|'.join(destinations),
+            'key': settings.DISTANCE_MATRIX_KEY
+        }
+
+        response = httpx.get(
+            self.url,
+            params=params,
+            timeout=settings.DISTANCE_MATRIX_TIMEOUT)
+        response.raise_for_status()
+        elements = response.json()['rows'][0]['elements']
+
+        return [
+            element['duration']['value']
+            if element['status'] == 'OK' else None
+            for element in elements
+        ]
+
+
+class LocalDistanceBackend:
+    """Deterministic durations without network, used in tests"""
+
+    def get_duration(self, origin, destination):
+        """Return duration in seconds based on both addresses"""
+        return 600 + sum(map(ord, origin + destination)) % 1800
+
+    def get_durations(self, origin, destinations):
+        return [self.get_duration(origin, destination)
+                for destination in destinations]
+
+
+def get_distance_backend():
+    return import_string(settings.DISTANCE_BACKEND)()
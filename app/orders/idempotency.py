@@ -0,0 +1,125 @@
+"""
+Idempotency keys which make retried order creation safe.
+"""
+
+import hashlib
+import json
+
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+
+from core.cache import call_cache
+
+IDEMPOTENCY_KEY = 'orders:idempotency:{0}:{1}'
+PENDING = 'pending'
+DONE = 'done'
+
+
+def storage_key(request, key):
+    """Key of stored response, scoped to user and endpoint"""
+    digest = hashlib.sha256(f'{request.path}:{key}'.encode()).hexdigest()
+    return IDEMPOTENCY_KEY.format(request.user.id, digest)
+
+
+def fingerprint(request):
+    """Hash of request body to detect key reused for other request"""
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def get_stored(key):
+    return call_cache(cache.get, key, default=None)
+
+
+def store_response(key, request_fingerprint, respond):
+    """Run request and keep its response, release key when it fails"""
+    try:
+        response = respond()
+    except Exception:
+        call_cache(cache.delete, key)
+        raise
+
+    if response.status_code >= 500:
+        call_cache(cache.delete, key)
+        return response
+
+    call_cache(cache.set, key, {
+        'state': DONE,
+        'fingerprint': request_fingerprint,
+        'status': response.status_code,
+        'data': response.data,
+    }, timeout=settings.IDEMPOTENCY_KEY_TIMEOUT)
+    return response
+
+
+def idempotent_response(request, key, respond):
+    """Return stored response for key or run request once for it"""
+    storage = storage_key(request, key)
+    request_fingerprint = fingerprint(request)
+    stored = get_stored(storage)
+
+    if stored is None:
+        """
+        Only request which takes the key runs. Its marker outlives any
+        request, so a retry never runs while the first one is unfinished.
+        """
+        is_owner = call_cache(
+            cache.add, storage,
+            {'state': PENDING, 'fingerprint': request_fingerprint},
+            timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT,
+            default=True)
+
+        if is_owner:
+            return store_response(storage, request_fingerprint, respond)
+
+        stored = get_stored(storage)
+
+        """Request holding the key failed in between, so this one can run"""
+        if stored is None:
+            return idempotent_response(request, key, respond)
+
+    if stored['fingerprint'] != request_fingerprint:
+        msg = _("Idempotency-Key was already used for other request")
+        return Response({'detail': msg},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    """Client retries later instead of holding web worker while waiting"""
+    if stored['state'] == PENDING:
+        msg = _("Request with this Idempotency-Key is still in progress")
+        return Response({'detail': msg}, status=status.HTTP_409_CONFLICT)
+
+    return Response(stored['data'],
+                    status=stored['status'],
+                    headers={'Idempotent-Replayed': 'true'})
+
+
+class IdempotentCreateMixin:
+    """Replay response of request repeated with the same Idempotency-Key"""
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+
+        if key is None:
+            return super().create(request, *args, **kwargs)
+
+        if not key or len(key) > 255:
+            msg = _("Idempotency-Key should have 1 to 255 characters")
+            return Response({'detail': msg},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return idempotent_response(
+            request, key, partial(self.create_response, request, *args,
+                                  **kwargs))
+
+    def create_response(self, request, *args, **kwargs):
+        """Turn API errors into response, so they are stored as well"""
+        try:
+            return super().create(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
@@ -0,0 +1,36 @@
+"""
+Command to precompute delivery durations from restaurants to Warsaw districts.
+"""
+
+from django.core.management.base import BaseCommand
+
+from core.models import Restaurant
+
+from orders.matrix import refresh_matrix
+
+
+class Command(BaseCommand):
+    """Refresh delivery time matrix command."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--restaurant',
+            action='append',
+            dest='slugs',
+            help='Refresh only restaurant with given slug')
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Refresh also entries which are not stale')
+
+    def handle(self, *args, **options):
+        """Entrypoint"""
+        restaurants = Restaurant.objects.all()
+
+        if options['slugs']:
+            restaurants = restaurants.filter(slug__in=options['slugs'])
+
+        refreshed = refresh_matrix(restaurants, force=options['force'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed delivery times of {refreshed} restaurants'))
@@ -0,0 +1,127 @@
+"""
+Precomputed delivery durations from restaurants to Warsaw post code districts.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.models import Restaurant, DeliveryTimeMatrix
+
+from .cache import normalize_post_code
+from .distance import get_distance_backend, format_address
+
+"""Warsaw post codes are 00-000 to 04-999, district is 00-0 to 04-9"""
+WARSAW_DISTRICTS = [
+    f'{area:02d}-{district}' for area in range(5) for district in range(10)
+]
+
+
+def post_code_district(post_code):
+    return normalize_post_code(post_code)[:4]
+
+
+def district_address(district):
+    return f'{district}00 Warsaw, Poland'
+
+
+def restaurant_origin(restaurant):
+    return format_address(restaurant.address,
+                          restaurant.city,
+                          restaurant.post_code)
+
+
+def matrix_duration(restaurant, matrix, post_code):
+    """
+    Return duration in seconds from (origin, durations) of matrix or None,
+    durations from old address of restaurant are not used
+    """
+    if matrix is None:
+        return None
+
+    origin, durations = matrix
+    if origin != restaurant_origin(restaurant) or not durations:
+        return None
+
+    return durations.get(post_code_district(post_code))
+
+
+def lookup_duration(restaurant, post_code):
+    """Return precomputed duration in seconds or None"""
+    matrix = DeliveryTimeMatrix.objects.filter(restaurant=restaurant)\
+        .values_list('origin', 'durations').first()
+
+    return matrix_duration(restaurant, matrix, post_code)
+
+
+def stale_districts(matrix, origin, stale_before):
+    """Return districts which durations are missing or fetched too long ago"""
+    if matrix is None or matrix.origin != origin:
+        return WARSAW_DISTRICTS
+
+    stale_before = stale_before.timestamp()
+    return [district for district in WARSAW_DISTRICTS
+            if matrix.durations.get(district) is None
+            or matrix.fetched_at.get(district, 0) < stale_before]
+
+
+def fetch_durations(backend, origin, districts):
+    """Fetch durations in batches accepted by distance backend"""
+    durations = {}
+    batch_size = settings.DELIVERY_MATRIX_BATCH_SIZE
+
+    for start in range(0, len(districts), batch_size):
+        batch = districts[start:start + batch_size]
+        durations.update(zip(batch, backend.get_durations(
+            origin, [district_address(district) for district in batch])))
+
+    return durations
+
+
+def refresh_matrix(restaurants=None, force=False):
+    """Refresh stale matrix rows, return number of refreshed restaurants"""
+    if restaurants is None:
+        restaurants = Restaurant.objects.all()
+    restaurants = list(restaurants)
+
+    backend = get_distance_backend()
+    stale_before = timezone.now() - timedelta(
+        seconds=settings.DELIVERY_MATRIX_MAX_AGE)
+    matrices = DeliveryTimeMatrix.objects.in_bulk(
+        [restaurant.id for restaurant in restaurants])
+    refreshed = 0
+
+    for restaurant in restaurants:
+        origin = restaurant_origin(restaurant)
+        matrix = matrices.get(restaurant.id)
+        districts = WARSAW_DISTRICTS if force else \
+            stale_districts(matrix, origin, stale_before)
+
+        if not districts:
+            continue
+
+        """Durations from old address are of no use, stale ones are kept
+        until their lookup succeeds"""
+        if matrix and matrix.origin == origin:
+            durations = dict(matrix.durations)
+            fetched_at = dict(matrix.fetched_at)
+        else:
+            durations, fetched_at = {}, {}
+
+        """Failed lookups are not stored, so next run tries them again"""
+        now = timezone.now().timestamp()
+        for district, duration in fetch_durations(
+                backend, origin, districts).items():
+            if duration is not None:
+                durations[district] = duration
+                fetched_at[district] = now
+
+        DeliveryTimeMatrix.objects.update_or_create(
+            restaurant=restaurant,
+            defaults={'origin': origin,
+                      'durations': durations,
+                      'fetched_at': fetched_at})
+        refreshed += 1
+
+    return refreshed
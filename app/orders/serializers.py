@@ -1,106 +1,210 @@
 from rest_framework import serializers
 
+from django.conf import settings
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 
-from decimal import Decimal
+from core.models import (Order, OrderMeal, OrderDrink, Menu, Meal, Drink,
+                         Restaurant)
+from core.pricing import price_order
 
-from core.models import Order, OrderMeal, OrderDrink, Menu
+from .distance import format_duration
+from .matrix import lookup_duration
+from .tasks import estimate_delivery_time
 
+"""Upper bound of PositiveSmallIntegerField on every database"""
+MAX_LINE_QUANTITY = 32767
 
-def calculate(meal=None, drink=None, restaurant=None):
-    """counting the number of the same object"""
-    if meal:
+
+def add_id(ids, value):
+    """Keep only values which can be primary keys"""
+    try:
+        ids.add(int(value))
+    except (TypeError, ValueError):
+        pass
+
+
+def collect_ids(orders):
+    """Return submitted ids of restaurants, meals and drinks"""
+    ids = {'restaurant': set(), 'meal': set(), 'drink': set()}
+
+    for order in orders:
+        if not isinstance(order, dict):
+            continue
+
+        add_id(ids['restaurant'], order.get('restaurant'))
+
+        for data_name in ('meal', 'drink'):
+            items = order.get(f'{data_name}s')
+            if not isinstance(items, list):
+                continue
+            for item in items:
+                if isinstance(item, dict):
+                    add_id(ids[data_name], item.get(data_name))
+
+    return ids
+
+
+def aggregate(data_name, counted_object):
+    """Collapse the same objects into one with summed quantity"""
+    aggregated = {}
+
+    for data in counted_object:
+        object_id = data[data_name].id
+
+        if object_id in aggregated:
+            aggregated[object_id]['quantity'] += data['quantity']
+        else:
+            aggregated[object_id] = {
+                data_name: data[data_name],
+                'quantity': data['quantity']
+            }
+
+    """Summed quantity has to fit in the column of order line"""
+    too_many = sorted(object_id for object_id, data in aggregated.items()
+                      if data['quantity'] > MAX_LINE_QUANTITY)
+
+    if too_many:
+        msg = _(f"Quantity of {data_name} can't exceed {MAX_LINE_QUANTITY}: "
+                f"{', '.join(str(object_id) for object_id in too_many)}")
+        raise serializers.ValidationError(
+            {f'{data_name} quantity': msg},
+            code='quantity')
+
+    return list(aggregated.values())
+
+
+def calculate(meal=None, drink=None, restaurant=None, menu_ids=None):
+    """
+    counting the number of the same object, menu_ids are ids
+    of restaurant menu objects when they were already loaded
+    """
+    if meal is not None:
         data_name = 'meal'
         counted_object = meal
-    if drink:
+    if drink is not None:
         data_name = 'drink'
         counted_object = drink
 
-    calculated_object = []
+    if not counted_object:
+        return []
 
-    """Raise error for wrong meal and counting the number of the same object"""
-    for data in counted_object:
-        params = {
+    """Raise error for all objects which don't come from restaurant menu"""
+    submitted_ids = {data[data_name].id for data in counted_object}
+    if menu_ids is None:
+        menu_ids = set(Menu.objects.filter(**{
             'restaurant': restaurant,
-            f'{data_name}s': data[data_name].id
-        }
+            f'{data_name}s__in': submitted_ids
+        }).values_list(f'{data_name}s', flat=True))
+    wrong_ids = sorted(submitted_ids - menu_ids)
 
-        if not Menu.objects.filter(**params).exists():
-            msg = _(f"Some {data_name} doesn't come from restaurant menu")
-            raise serializers.ValidationError(
-                {f'wrong {data_name}': msg},
-                code=data_name)
+    if wrong_ids:
+        msg = _(f"Some {data_name} doesn't come from restaurant menu: "
+                f"{', '.join(str(wrong_id) for wrong_id in wrong_ids)}")
+        raise serializers.ValidationError(
+            {f'wrong {data_name}': msg},
+            code=data_name)
+
+    return aggregate(data_name, counted_object)
+
+
+def summarize(meals, drinks):
+    """Return item count and most ordered items of order"""
+    items = [(data['meal'], data['quantity']) for data in meals]
+    items += [(data['drink'], data['quantity']) for data in drinks]
+    items.sort(key=lambda item: item[1], reverse=True)
+
+    top_items = ', '.join(
+        f'{quantity}x {item}'
+        for item, quantity in items[:settings.ORDER_SUMMARY_TOP_ITEMS])
+    max_length = Order._meta.get_field('top_items').max_length
+
+    if len(top_items) > max_length:
+        top_items = top_items[:max_length - 3] + '...'
+
+    return sum(quantity for _, quantity in items), top_items
 
-        if not calculated_object:
-            calculated_object.append(
-                {data_name: data[data_name], 'quantity': data['quantity']})
-            continue
 
-        for calculated_data in calculated_object:
-            if data[data_name].id == calculated_data[data_name].id:
-                calculated_data['quantity'] += data['quantity']
-                break
-            else:
-                calculated_object.append(
-                    {data_name: data[data_name], 'quantity': data['quantity']})
-                break
+def summarize_order(order):
+    """Store summary of order again from its saved lines"""
+    meals = [{'meal': line.name, 'quantity': line.quantity}
+             for line in order.ordermeal_set.order_by('id')]
+    drinks = [{'drink': line.name, 'quantity': line.quantity}
+              for line in order.orderdrink_set.order_by('id')]
 
-    return calculated_object
+    order.item_count, order.top_items = summarize(meals, drinks)
+    order.save(update_fields=['item_count', 'top_items'])
+
+
+def order_lines(order, meals, drinks, price):
+    """Return order meals and drinks with names and prices snapshotted"""
+    order_meals = [
+        OrderMeal(order=order, name=str(data['meal']),
+                  unit_price=line.unit_price, line_total=line.total, **data)
+        for data, line in zip(meals, price.meal_lines)]
+    order_drinks = [
+        OrderDrink(order=order, name=str(data['drink']),
+                   unit_price=line.unit_price, line_total=line.total, **data)
+        for data, line in zip(drinks, price.drink_lines)]
+
+    return order_meals, order_drinks
 
 
 class OrderMealSerializer(serializers.ModelSerializer):
     total_price = serializers.DecimalField(
-        max_digits=5,
+        max_digits=10,
         decimal_places=2,
         source='get_total_meal_price',
         read_only=True)
     price = serializers.DecimalField(
         max_digits=5,
         decimal_places=2,
-        source='meal.price',
+        source='unit_price',
         read_only=True)
 
     class Meta:
         model = OrderMeal
-        exclude = ('order', 'id')
+        exclude = ('order', 'id', 'name', 'unit_price', 'line_total')
 
 
 class OrderDetailMealSerializer(OrderMealSerializer):
-    meal = serializers.StringRelatedField()
+    meal = serializers.CharField(source='name', read_only=True)
 
 
 class OrderDrinkSerializer(serializers.ModelSerializer):
     total_price = serializers.DecimalField(
-        max_digits=5,
+        max_digits=10,
         decimal_places=2,
         source='get_total_drink_price',
         read_only=True)
     price = serializers.DecimalField(
         max_digits=5,
         decimal_places=2,
-        source='drink.price',
+        source='unit_price',
         read_only=True)
 
     class Meta:
         model = OrderDrink
-        exclude = ('order', 'id')
+        exclude = ('order', 'id', 'name', 'unit_price', 'line_total')
 
 
 class OrderDetailDrinkSerializer(OrderDrinkSerializer):
-    drink = serializers.StringRelatedField()
+    drink = serializers.CharField(source='name', read_only=True)
 
 
 class OrderSerializer(serializers.ModelSerializer):
     total_price = serializers.DecimalField(
-        max_digits=5,
+        max_digits=10,
         decimal_places=2,
         default=0.00)
-    restaurant = serializers.StringRelatedField()
+    restaurant = serializers.CharField(source='restaurant_name',
+                                       read_only=True)
     order_time = serializers.DateTimeField(format='%Y-%m-%d %H:%m')
 
     class Meta:
         model = Order
-        exclude = ('user',)
+        exclude = ('user', 'restaurant_name')
+        read_only_fields = ('item_count', 'top_items')
 
 
 class OrderDetailSerializer(OrderSerializer):
@@ -108,17 +212,39 @@ class OrderDetailSerializer(OrderSerializer):
     drinks = serializers.SerializerMethodField()
 
     def get_meals(self, obj):
-        meals = OrderMeal.objects.filter(order=obj)
+        meals = obj.ordermeal_set.all()
         return OrderDetailMealSerializer(meals, many=True).data
 
     def get_drinks(self, obj):
-        drinks = OrderDrink.objects.filter(order=obj)
+        drinks = obj.orderdrink_set.all()
         return OrderDetailDrinkSerializer(drinks, many=True).data
 
 
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field resolved from objects loaded up front"""
+
+    def to_internal_value(self, data):
+        objects = self.context['preloaded'][self.queryset.model]
+
+        try:
+            return objects[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class OrderCreateMealSerializer(OrderMealSerializer):
+    meal = PreloadedPrimaryKeyRelatedField(queryset=Meal.objects.all())
+
+
+class OrderCreateDrinkSerializer(OrderDrinkSerializer):
+    drink = PreloadedPrimaryKeyRelatedField(queryset=Drink.objects.all())
+
+
 class OrderCreateSerializer(serializers.ModelSerializer):
-    meals = OrderMealSerializer(many=True, write_only=True)
-    drinks = OrderDrinkSerializer(many=True, write_only=True)
+    meals = OrderCreateMealSerializer(many=True, write_only=True)
+    drinks = OrderCreateDrinkSerializer(many=True, write_only=True)
     order_time = serializers.DateTimeField(
         format='%Y-%m-%d %H:%m',
         read_only=True)
@@ -126,7 +252,20 @@ class OrderCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         exclude = ('user',)
-        read_only_fields = ('average_delivery_time', 'total_price')
+        read_only_fields = ('average_delivery_time', 'total_price',
+                            'delivery_price', 'restaurant_name',
+                            'item_count', 'top_items')
+
+    def to_internal_value(self, data):
+        """Meals and drinks of order are loaded in one query per type"""
+        if 'preloaded' not in self.context:
+            ids = collect_ids([data])
+            self.context['preloaded'] = {
+                Meal: Meal.objects.in_bulk(ids['meal']),
+                Drink: Drink.objects.in_bulk(ids['drink']),
+            }
+
+        return super().to_internal_value(data)
 
     def validate(self, attr):
         restaurant = attr.get('restaurant')
@@ -155,33 +294,64 @@ class OrderCreateSerializer(serializers.ModelSerializer):
 
         """Validate that meals and drinks come
            from right restaurant and calculate them"""
-        attr['meals'] = calculate(meal=meals, restaurant=restaurant)
-        attr['drinks'] = calculate(drink=drinks, restaurant=restaurant)
+        attr['meals'] = calculate(
+            meal=meals,
+            restaurant=restaurant,
+            menu_ids=self.loaded_menu_ids('meal', restaurant))
+        attr['drinks'] = calculate(
+            drink=drinks,
+            restaurant=restaurant,
+            menu_ids=self.loaded_menu_ids('drink', restaurant))
 
         return attr
 
+    def loaded_menu_ids(self, data_name, restaurant):
+        """Menu is looked up by calculate() for single order"""
+        return None
+
     def create(self, validated_data):
         meals = validated_data.pop('meals')
         drinks = validated_data.pop('drinks')
-        order = Order.objects.create(**validated_data)
-        total = Decimal(0)
-
-        """Create meals and drink models for order"""
-        for meal_data in meals:
-            OrderMeal.objects.create(order=order, **meal_data)
 
-        for drink_data in drinks:
-            OrderDrink.objects.create(order=order, **drink_data)
+        price = price_order(meals, drinks,
+                            validated_data['restaurant'].delivery_price)
+
+        """Keep summary shown in order history on order itself"""
+        validated_data['item_count'], validated_data['top_items'] = \
+            summarize(meals, drinks)
+
+        """Take delivery time from precomputed matrix when possible"""
+        duration = lookup_duration(
+            validated_data['restaurant'],
+            validated_data['delivery_post_code'])
+        if duration is not None:
+            validated_data['average_delivery_time'] = \
+                format_duration(duration)
+
+        """Create order with its meals and drinks in one transaction"""
+        with transaction.atomic():
+            order = Order.objects.create(
+                total_price=price.total,
+                delivery_price=price.delivery,
+                **validated_data)
+            order_meals, order_drinks = order_lines(
+                order, meals, drinks, price)
+            OrderMeal.objects.bulk_create(order_meals)
+            OrderDrink.objects.bulk_create(order_drinks)
+
+            """Estimate delivery time in worker once order is stored"""
+            if not order.average_delivery_time:
+                transaction.on_commit(
+                    lambda: estimate_delivery_time.delay(order.id))
 
-        meals = OrderMeal.objects.filter(order=order)
-        drinks = OrderDrink.objects.filter(order=order)
+        return order
 
-        total += Decimal(
-            sum([meal.get_total_meal_price for meal in meals]))
-        total += Decimal(
-            sum([drink.get_total_drink_price for drink in drinks]))
 
-        order.total_price = total
-        order.save()
+class BulkOrderSerializer(OrderCreateSerializer):
+    """Order of bulk request validated against preloaded objects"""
+    restaurant = PreloadedPrimaryKeyRelatedField(
+        queryset=Restaurant.objects.all())
 
-        return order
+    def loaded_menu_ids(self, data_name, restaurant):
+        return self.context['preloaded']['menus'][data_name]\
+            .get(restaurant.id, set())
@@ -0,0 +1,46 @@
+from celery import shared_task
+
+import httpx
+
+from core.models import Order
+
+from . import cache, matrix
+from .distance import (get_distance_backend,
+                       format_address,
+                       format_duration)
+
+NOT_AVAILABLE = 'Average delivery time cannot be calculated'
+
+
+@shared_task(autoretry_for=(httpx.HTTPError,),
+             retry_backoff=True,
+             max_retries=3)
+def estimate_delivery_time(order_id):
+    """Fill in average delivery time of created order"""
+    order = Order.objects.select_related('restaurant').get(id=order_id)
+    restaurant = order.restaurant
+
+    origin = format_address(restaurant.address,
+                            restaurant.city,
+                            restaurant.post_code)
+    destination = format_address(order.delivery_address,
+                                 order.delivery_city,
+                                 order.delivery_post_code)
+
+    duration = cache.get_duration(
+        restaurant.post_code,
+        order.delivery_post_code,
+        lambda: get_distance_backend().get_duration(origin, destination))
+    average_delivery_time = NOT_AVAILABLE if duration is None \
+        else format_duration(duration)
+
+    Order.objects.filter(id=order_id)\
+        .update(average_delivery_time=average_delivery_time)
+
+    return average_delivery_time
+
+
+@shared_task
+def refresh_delivery_matrix():
+    """Refresh stale precomputed delivery durations"""
+    return matrix.refresh_matrix()
@@ -0,0 +1,176 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from core import models
+
+from orders.matrix import restaurant_origin
+from orders.tests.test_order_api import (create_user, sample_restaurant,
+                                         sample_meal, sample_drink)
+
+ORDER_BULK_URL = reverse('orders:order-bulk')
+
+
+class BulkOrderAPITests(APITestCase):
+
+    def setUp(self):
+        self.user = create_user(
+            email='test@test.com',
+            password='testpass',
+            name='Test name'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.restaurant = sample_restaurant('restaurant1')
+        self.meal = sample_meal(name='meal1')
+        self.drink = sample_drink(name='drink1')
+        menu = models.Menu.objects.create(restaurant=self.restaurant)
+        menu.meals.set([self.meal])
+        menu.drinks.set([self.drink])
+
+    def sample_payload(self, **params):
+        payload = {
+            'restaurant': self.restaurant.id,
+            'meals': [{'meal': self.meal.id, 'quantity': 2}],
+            'drinks': [{'drink': self.drink.id, 'quantity': 1}],
+            'delivery_city': 'Warsaw',
+            'delivery_address': 'some address',
+            'delivery_post_code': '01-223',
+            'delivery_phone': 'some phone'
+        }
+        payload.update(**params)
+        return payload
+
+    def test_bulk_create_orders(self):
+        res = self.client.post(
+            ORDER_BULK_URL, [self.sample_payload() for _ in range(3)])
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 3)
+        self.assertEqual(res.data['failed'], 0)
+
+        orders = models.Order.objects.filter(user=self.user)
+        self.assertEqual(orders.count(), 3)
+        for result, order in zip(res.data['results'], orders.order_by('id')):
+            self.assertEqual(result['status'], 'created')
+            self.assertEqual(result['order']['id'], order.id)
+            self.assertEqual(order.total_price, 34.50)
+            self.assertEqual(order.restaurant_name, 'Restaurant1')
+            self.assertEqual(order.item_count, 3)
+            self.assertEqual(order.top_items, '2x Meal1, 1x Drink1')
+        self.assertEqual(models.OrderMeal.objects.count(), 3)
+        self.assertEqual(models.OrderDrink.objects.count(), 3)
+
+    def test_bulk_create_reports_partial_failure(self):
+        other_meal = sample_meal(name='meal2')
+        payload = [
+            self.sample_payload(),
+            self.sample_payload(
+                meals=[{'meal': other_meal.id, 'quantity': 1}]),
+            self.sample_payload(restaurant=0),
+            self.sample_payload(delivery_city='Cracow'),
+        ]
+
+        res = self.client.post(ORDER_BULK_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual(res.data['failed'], 3)
+        self.assertEqual([result['index'] for result in res.data['results']],
+                         [0, 1, 2, 3])
+        self.assertEqual([result['status'] for result in res.data['results']],
+                         ['created', 'failed', 'failed', 'failed'])
+        self.assertIn('wrong meal', res.data['results'][1]['errors'])
+        self.assertIn('restaurant', res.data['results'][2]['errors'])
+        self.assertIn('delivery_city', res.data['results'][3]['errors'])
+        self.assertEqual(models.Order.objects.count(), 1)
+
+    def test_bulk_create_rejects_too_big_summed_quantity(self):
+        line = {'meal': self.meal.id, 'quantity': 32767}
+        payload = [self.sample_payload(),
+                   self.sample_payload(meals=[line, line])]
+
+        res = self.client.post(ORDER_BULK_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertIn('meal quantity', res.data['results'][1]['errors'])
+        self.assertEqual(models.Order.objects.count(), 1)
+
+    def test_bulk_create_all_failed(self):
+        res = self.client.post(
+            ORDER_BULK_URL, [self.sample_payload(meals=[])])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(models.Order.objects.exists())
+
+    def test_bulk_create_rejects_non_list(self):
+        res = self.client.post(ORDER_BULK_URL, self.sample_payload())
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(ORDER_BULK_MAX_SIZE=2)
+    def test_bulk_create_size_is_limited(self):
+        res = self.client.post(
+            ORDER_BULK_URL, [self.sample_payload() for _ in range(3)])
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(models.Order.objects.exists())
+
+    def test_bulk_create_query_count_does_not_grow_with_orders(self):
+        def create_orders(size):
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(
+                    ORDER_BULK_URL,
+                    [self.sample_payload() for _ in range(size)])
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        self.assertEqual(create_orders(2), create_orders(20))
+
+    def test_bulk_create_queues_delivery_time_estimation(self):
+        with patch('orders.bulk.estimate_delivery_time.delay') as patched, \
+                self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                ORDER_BULK_URL, [self.sample_payload() for _ in range(2)])
+
+        ids = [result['order']['id'] for result in res.data['results']]
+        self.assertEqual(
+            [call.args[0] for call in patched.call_args_list], ids)
+
+    def test_bulk_create_uses_delivery_time_matrix(self):
+        models.DeliveryTimeMatrix.objects.create(
+            restaurant=self.restaurant,
+            origin=restaurant_origin(self.restaurant),
+            durations={'01-2': 1200})
+
+        with patch('orders.bulk.estimate_delivery_time.delay') as patched, \
+                self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(ORDER_BULK_URL, [self.sample_payload()])
+
+        order = models.Order.objects.get(
+            id=res.data['results'][0]['order']['id'])
+        self.assertEqual(order.average_delivery_time, '20 mins')
+        patched.assert_not_called()
+
+    def test_bulk_create_skips_matrix_of_old_address(self):
+        models.DeliveryTimeMatrix.objects.create(
+            restaurant=self.restaurant,
+            origin=restaurant_origin(self.restaurant),
+            durations={'01-2': 1200})
+        self.restaurant.address = 'otheraddress'
+        self.restaurant.save()
+
+        with patch('orders.bulk.estimate_delivery_time.delay') as patched, \
+                self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(ORDER_BULK_URL, [self.sample_payload()])
+
+        order_id = res.data['results'][0]['order']['id']
+        self.assertEqual(
+            models.Order.objects.get(id=order_id).average_delivery_time, '')
+        patched.assert_called_once_with(order_id)
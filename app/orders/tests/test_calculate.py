@@ -0,0 +1,107 @@
+from collections import Counter
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from hypothesis import given, strategies as st
+from rest_framework.serializers import ValidationError
+
+from orders.serializers import MAX_LINE_QUANTITY, aggregate, summarize
+
+
+items = st.lists(
+    st.tuples(
+        st.integers(min_value=1, max_value=20),
+        st.integers(min_value=1, max_value=100)
+    ),
+    max_size=300
+)
+
+
+def sample_items(data_name, pairs):
+    """Build serializer-like line items from (id, quantity) pairs"""
+    objects = {}
+    return [
+        {
+            data_name: objects.setdefault(
+                object_id, SimpleNamespace(id=object_id)),
+            'quantity': quantity
+        }
+        for object_id, quantity in pairs
+    ]
+
+
+class AggregateTests(SimpleTestCase):
+
+    @given(items)
+    def test_ids_are_unique(self, pairs):
+        result = aggregate('meal', sample_items('meal', pairs))
+
+        ids = [data['meal'].id for data in result]
+        self.assertEqual(len(ids), len(set(ids)))
+
+    @given(items)
+    def test_quantities_are_summed(self, pairs):
+        result = aggregate('drink', sample_items('drink', pairs))
+
+        expected = Counter()
+        for object_id, quantity in pairs:
+            expected[object_id] += quantity
+
+        self.assertEqual(
+            {data['drink'].id: data['quantity'] for data in result},
+            dict(expected))
+
+    @given(items)
+    def test_first_appearance_order_is_kept(self, pairs):
+        result = aggregate('meal', sample_items('meal', pairs))
+
+        expected = list(dict.fromkeys(object_id for object_id, _ in pairs))
+        self.assertEqual([data['meal'].id for data in result], expected)
+
+    @given(items)
+    def test_aggregation_is_idempotent(self, pairs):
+        once = aggregate('meal', sample_items('meal', pairs))
+        twice = aggregate('meal', once)
+
+        self.assertEqual(
+            [(data['meal'].id, data['quantity']) for data in once],
+            [(data['meal'].id, data['quantity']) for data in twice])
+
+    def test_summed_quantity_is_limited(self):
+        pairs = [(1, MAX_LINE_QUANTITY), (2, 1), (1, MAX_LINE_QUANTITY)]
+
+        with self.assertRaises(ValidationError) as error:
+            aggregate('meal', sample_items('meal', pairs))
+
+        self.assertIn('meal quantity', error.exception.detail)
+
+    def test_summed_quantity_up_to_limit(self):
+        pairs = [(1, MAX_LINE_QUANTITY - 1), (1, 1)]
+
+        result = aggregate('meal', sample_items('meal', pairs))
+
+        self.assertEqual(result[0]['quantity'], MAX_LINE_QUANTITY)
+
+
+class SummarizeTests(SimpleTestCase):
+
+    @given(items, items)
+    def test_item_count_sums_quantities(self, meals, drinks):
+        item_count, top_items = summarize(
+            sample_items('meal', meals), sample_items('drink', drinks))
+
+        self.assertEqual(
+            item_count, sum(quantity for _, quantity in meals + drinks))
+        self.assertLessEqual(len(top_items), 255)
+
+    def test_long_top_items_are_truncated(self):
+        meals = [{'meal': 'x' * 200, 'quantity': 2},
+                 {'meal': 'y' * 200, 'quantity': 1}]
+
+        item_count, top_items = summarize(meals, [])
+
+        self.assertEqual(item_count, 3)
+        self.assertEqual(len(top_items), 255)
+        self.assertTrue(top_items.startswith('2x ' + 'x' * 200))
+        self.assertTrue(top_items.endswith('...'))
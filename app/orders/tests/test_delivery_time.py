@@ -0,0 +1,430 @@
+from unittest.mock import Mock, patch
+from threading import Timer
+
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from redis.exceptions import RedisError
+
+import httpx
+
+from core import models
+
+from orders import cache as duration_cache
+from orders.distance import DistanceMatrixBackend, LocalDistanceBackend
+from orders.matrix import (refresh_matrix,
+                           lookup_duration,
+                           WARSAW_DISTRICTS)
+from orders.tasks import estimate_delivery_time, NOT_AVAILABLE
+
+ORDER_CREATE_URL = reverse('orders:order-create')
+
+
+def sample_restaurant():
+    return models.Restaurant.objects.create(
+        name='testrestaurant',
+        city='Warsaw',
+        address='testaddress',
+        post_code='00-000',
+        phone='00000000000',
+        cuisine=models.Cuisine.objects.create(name='testcuisine'),
+        delivery_price=12.00
+    )
+
+
+def sample_order(user):
+    return models.Order.objects.create(
+        user=user,
+        restaurant=sample_restaurant(),
+        delivery_address='testaddress',
+        delivery_city='Warsaw',
+        delivery_post_code='01-100',
+        delivery_phone='testphone'
+    )
+
+
+def matrix_response(element):
+    return httpx.Response(
+        200,
+        json={'rows': [{'elements': [element]}]},
+        request=httpx.Request('GET', DistanceMatrixBackend.url))
+
+
+class NoResultsBackend:
+
+    def get_duration(self, origin, destination):
+        return None
+
+
+class DeliveryTimeTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        duration_cache.local_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='testpass',
+            name='Test name'
+        )
+
+    @override_settings(
+        DISTANCE_BACKEND='orders.distance.LocalDistanceBackend')
+    def test_estimate_delivery_time(self):
+        order = sample_order(self.user)
+
+        result = estimate_delivery_time(order.id)
+
+        order.refresh_from_db()
+        self.assertEqual(order.average_delivery_time, result)
+        self.assertTrue(result.endswith(' mins'))
+
+    @override_settings(
+        DISTANCE_BACKEND='orders.tests.test_delivery_time.NoResultsBackend')
+    def test_estimate_delivery_time_without_results(self):
+        order = sample_order(self.user)
+
+        estimate_delivery_time(order.id)
+
+        order.refresh_from_db()
+        self.assertEqual(order.average_delivery_time, NOT_AVAILABLE)
+
+    def test_local_backend_is_deterministic(self):
+        backend = LocalDistanceBackend()
+
+        self.assertEqual(
+            backend.get_duration('origin', 'destination'),
+            backend.get_duration('origin', 'destination'))
+
+    @patch('orders.distance.httpx.get')
+    def test_distance_matrix_backend(self, patched_get):
+        patched_get.return_value = matrix_response(
+            {'status': 'OK', 'duration': {'text': '25 mins', 'value': 1500}})
+
+        duration = DistanceMatrixBackend().get_duration('origin', 'dest')
+
+        self.assertEqual(duration, 1500)
+
+    @patch('orders.distance.httpx.get')
+    def test_distance_matrix_backend_zero_results(self, patched_get):
+        patched_get.return_value = matrix_response({'status': 'ZERO_RESULTS'})
+
+        duration = DistanceMatrixBackend().get_duration('origin', 'dest')
+
+        self.assertIsNone(duration)
+
+
+class DurationCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        duration_cache.local_cache.clear()
+
+    def test_normalize_post_code(self):
+        normalize = duration_cache.normalize_post_code
+
+        self.assertEqual(normalize('01-223'), '01-223')
+        self.assertEqual(normalize(' 01223 '), '01-223')
+
+    def test_duration_is_fetched_once_per_post_codes(self):
+        fetch = Mock(return_value=1500)
+
+        first = duration_cache.get_duration('00-000', '01-223', fetch)
+        duration_cache.local_cache.clear()
+        second = duration_cache.get_duration('00000', '01 223', fetch)
+
+        self.assertEqual(first, 1500)
+        self.assertEqual(second, 1500)
+        fetch.assert_called_once()
+
+    def test_missing_result_is_cached(self):
+        fetch = Mock(return_value=None)
+
+        duration_cache.get_duration('00-000', '01-223', fetch)
+        duration = duration_cache.get_duration('00-000', '01-223', fetch)
+
+        self.assertIsNone(duration)
+        fetch.assert_called_once()
+
+    def test_concurrent_lookup_waits_for_lock_owner(self):
+        key = duration_cache.DURATION_KEY.format('00-000', '01-223')
+        lock_key = duration_cache.LOCK_KEY.format('00-000', '01-223')
+        cache.add(lock_key, 1)
+        fetch = Mock(return_value=1)
+
+        timer = Timer(0.2, cache.set, args=(key, 1500))
+        timer.start()
+        duration = duration_cache.get_duration('00-000', '01-223', fetch)
+        timer.join()
+
+        self.assertEqual(duration, 1500)
+        fetch.assert_not_called()
+
+    def test_duration_is_stored_before_lock_is_released(self):
+        key = duration_cache.DURATION_KEY.format('00-000', '01-223')
+        lock_key = duration_cache.LOCK_KEY.format('00-000', '01-223')
+        stored_at_release = []
+        delete = cache.delete
+
+        def release(released_key):
+            if released_key == lock_key:
+                stored_at_release.append(cache.get(key))
+            return delete(released_key)
+
+        with patch.object(cache, 'delete', side_effect=release):
+            duration_cache.get_duration('00-000', '01-223', Mock(
+                return_value=1500))
+
+        self.assertEqual(stored_at_release, [1500])
+        self.assertIsNone(cache.get(lock_key))
+
+    def test_failed_fetch_releases_lock_without_storing(self):
+        key = duration_cache.DURATION_KEY.format('00-000', '01-223')
+        lock_key = duration_cache.LOCK_KEY.format('00-000', '01-223')
+        fetch = Mock(side_effect=httpx.ConnectError('down'))
+
+        with self.assertRaises(httpx.ConnectError):
+            duration_cache.get_duration('00-000', '01-223', fetch)
+
+        self.assertIsNone(cache.get(lock_key))
+        self.assertIsNone(cache.get(key, None))
+
+    def test_local_cache_is_used_without_redis(self):
+        fetch = Mock(return_value=1500)
+
+        with patch.object(cache, 'get', side_effect=RedisError), \
+                patch.object(cache, 'add', side_effect=RedisError), \
+                patch.object(cache, 'set', side_effect=RedisError), \
+                patch.object(cache, 'delete', side_effect=RedisError):
+            first = duration_cache.get_duration('00-000', '01-223', fetch)
+            second = duration_cache.get_duration('00-000', '01-223', fetch)
+
+        self.assertEqual(first, 1500)
+        self.assertEqual(second, 1500)
+        fetch.assert_called_once()
+
+    def test_local_cache_evicts_least_recently_used(self):
+        local = duration_cache.LocalCache(maxsize=2, timeout=60)
+        local.set('a', 1)
+        local.set('b', 2)
+        local.get('a')
+        local.set('c', 3)
+
+        self.assertEqual(local.get('a'), 1)
+        self.assertIs(local.get('b'), duration_cache.MISSING)
+        self.assertEqual(local.get('c'), 3)
+
+    def test_local_cache_entries_expire(self):
+        local = duration_cache.LocalCache(maxsize=2, timeout=-1)
+        local.set('a', 1)
+
+        self.assertIs(local.get('a'), duration_cache.MISSING)
+
+
+@override_settings(DISTANCE_BACKEND='orders.distance.LocalDistanceBackend')
+class DeliveryMatrixTests(TestCase):
+
+    def setUp(self):
+        self.restaurant = sample_restaurant()
+
+    def test_refresh_matrix(self):
+        refreshed = refresh_matrix()
+
+        matrix = models.DeliveryTimeMatrix.objects.get(
+            restaurant=self.restaurant)
+        self.assertEqual(refreshed, 1)
+        self.assertEqual(sorted(matrix.durations), WARSAW_DISTRICTS)
+
+    def test_fresh_matrix_is_not_refreshed(self):
+        refresh_matrix()
+
+        self.assertEqual(refresh_matrix(), 0)
+        self.assertEqual(refresh_matrix(force=True), 1)
+
+    def test_stale_matrix_is_refreshed(self):
+        refresh_matrix()
+        matrix = models.DeliveryTimeMatrix.objects.get()
+        old = (timezone.now() - timedelta(days=30)).timestamp()
+        matrix.fetched_at = dict.fromkeys(matrix.fetched_at, old)
+        matrix.save()
+
+        self.assertEqual(refresh_matrix(), 1)
+        self.assertEqual(refresh_matrix(), 0)
+
+    def test_matrix_is_refreshed_after_address_change(self):
+        refresh_matrix()
+        self.restaurant.address = 'otheraddress'
+        self.restaurant.save()
+
+        self.assertEqual(refresh_matrix(), 1)
+
+    @patch('orders.distance.LocalDistanceBackend.get_durations')
+    def test_only_missing_districts_are_fetched(self, patched_durations):
+        patched_durations.side_effect = \
+            lambda origin, destinations: [900] * len(destinations)
+        refresh_matrix()
+        matrix = models.DeliveryTimeMatrix.objects.get(
+            restaurant=self.restaurant)
+        del matrix.durations['01-2']
+        matrix.save()
+        patched_durations.reset_mock()
+
+        refresh_matrix()
+
+        patched_durations.assert_called_once()
+        self.assertEqual(
+            patched_durations.call_args.args[1], ['01-200 Warsaw, Poland'])
+
+    @patch('orders.distance.LocalDistanceBackend.get_durations')
+    def test_only_stale_districts_are_fetched(self, patched_durations):
+        patched_durations.side_effect = \
+            lambda origin, destinations: [900] * len(destinations)
+        refresh_matrix()
+        matrix = models.DeliveryTimeMatrix.objects.get()
+        matrix.fetched_at['01-2'] = \
+            (timezone.now() - timedelta(days=30)).timestamp()
+        matrix.save()
+        patched_durations.reset_mock()
+
+        self.assertEqual(refresh_matrix(), 1)
+        self.assertEqual(
+            patched_durations.call_args.args[1], ['01-200 Warsaw, Poland'])
+        patched_durations.reset_mock()
+
+        self.assertEqual(refresh_matrix(), 0)
+        patched_durations.assert_not_called()
+
+    @patch('orders.distance.LocalDistanceBackend.get_durations')
+    def test_failed_districts_are_fetched_again(self, patched_durations):
+        patched_durations.side_effect = lambda origin, destinations: [
+            None if destination.startswith('01-2') else 900
+            for destination in destinations]
+        refresh_matrix()
+
+        matrix = models.DeliveryTimeMatrix.objects.get()
+        self.assertNotIn('01-2', matrix.durations)
+        self.assertNotIn('01-2', matrix.fetched_at)
+        self.assertEqual(lookup_duration(self.restaurant, '01-223'), None)
+
+        patched_durations.reset_mock()
+        patched_durations.side_effect = \
+            lambda origin, destinations: [600] * len(destinations)
+        self.assertEqual(refresh_matrix(), 1)
+
+        patched_durations.assert_called_once()
+        self.assertEqual(
+            patched_durations.call_args.args[1], ['01-200 Warsaw, Poland'])
+        self.assertEqual(lookup_duration(self.restaurant, '01-223'), 600)
+        self.assertEqual(lookup_duration(self.restaurant, '00-001'), 900)
+
+    def test_lookup_duration(self):
+        self.assertIsNone(lookup_duration(self.restaurant, '01-223'))
+
+        refresh_matrix()
+
+        matrix = models.DeliveryTimeMatrix.objects.get(
+            restaurant=self.restaurant)
+        self.assertEqual(
+            lookup_duration(self.restaurant, '01-223'),
+            matrix.durations['01-2'])
+
+    def test_lookup_duration_skips_matrix_of_old_address(self):
+        refresh_matrix()
+        self.restaurant.address = 'otheraddress'
+        self.restaurant.save()
+
+        self.assertIsNone(lookup_duration(self.restaurant, '01-223'))
+
+        refresh_matrix()
+
+        self.assertIsNotNone(lookup_duration(self.restaurant, '01-223'))
+
+    def test_refresh_delivery_matrix_command(self):
+        call_command('refresh_delivery_matrix',
+                     restaurant=[self.restaurant.slug],
+                     stdout=StringIO())
+
+        self.assertTrue(models.DeliveryTimeMatrix.objects.filter(
+            restaurant=self.restaurant).exists())
+
+
+class OrderCreateDeliveryTimeTests(APITestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            password='testpass',
+            name='Test name'
+        )
+        self.client.force_authenticate(self.user)
+
+    @patch('orders.serializers.estimate_delivery_time')
+    def test_create_order_schedules_estimation(self, patched_task):
+        restaurant = sample_restaurant()
+        meal = models.Meal.objects.create(
+            name='meal',
+            price=10.00,
+            description='description',
+            tag=models.Tag.objects.create(name='tag')
+        )
+        menu = models.Menu.objects.create(restaurant=restaurant)
+        menu.meals.set([meal])
+
+        payload = {
+            'restaurant': restaurant.id,
+            'meals': [{'meal': meal.id, 'quantity': 1}],
+            'drinks': [],
+            'delivery_city': 'Warsaw',
+            'delivery_address': 'some address',
+            'delivery_post_code': '01-223',
+            'delivery_phone': 'some phone'
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(ORDER_CREATE_URL, payload)
+            patched_task.delay.assert_not_called()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['average_delivery_time'], '')
+        patched_task.delay.assert_called_once_with(res.data['id'])
+
+    @override_settings(
+        DISTANCE_BACKEND='orders.distance.LocalDistanceBackend')
+    @patch('orders.serializers.estimate_delivery_time')
+    def test_create_order_uses_delivery_matrix(self, patched_task):
+        restaurant = sample_restaurant()
+        meal = models.Meal.objects.create(
+            name='meal',
+            price=10.00,
+            description='description',
+            tag=models.Tag.objects.create(name='tag')
+        )
+        menu = models.Menu.objects.create(restaurant=restaurant)
+        menu.meals.set([meal])
+        refresh_matrix()
+
+        payload = {
+            'restaurant': restaurant.id,
+            'meals': [{'meal': meal.id, 'quantity': 1}],
+            'drinks': [],
+            'delivery_city': 'Warsaw',
+            'delivery_address': 'some address',
+            'delivery_post_code': '01-223',
+            'delivery_phone': 'some phone'
+        }
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(ORDER_CREATE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(res.data['average_delivery_time'].endswith(' mins'))
+        patched_task.delay.assert_not_called()
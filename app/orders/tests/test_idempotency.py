@@ -0,0 +1,160 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.conf import settings
+from django.urls import reverse
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from core import models
+
+from orders import idempotency
+from orders.tests.test_order_api import (create_user, sample_restaurant,
+                                         sample_meal)
+
+ORDER_CREATE_URL = reverse('orders:order-create')
+ORDER_BULK_URL = reverse('orders:order-bulk')
+
+
+class IdempotencyTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user(
+            email='test@test.com',
+            password='testpass',
+            name='Test name'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.restaurant = sample_restaurant('restaurant1')
+        self.meal = sample_meal(name='meal1')
+        menu = models.Menu.objects.create(restaurant=self.restaurant)
+        menu.meals.set([self.meal])
+
+        self.payload = {
+            'restaurant': self.restaurant.id,
+            'meals': [{'meal': self.meal.id, 'quantity': 2}],
+            'drinks': [],
+            'delivery_city': 'Warsaw',
+            'delivery_address': 'some address',
+            'delivery_post_code': '01-223',
+            'delivery_phone': 'some phone'
+        }
+
+    def create_order(self, key, payload=None):
+        return self.client.post(ORDER_CREATE_URL,
+                                payload or self.payload,
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def storage_key(self, key, path=ORDER_CREATE_URL):
+        request = type('Request', (), {'path': path, 'user': self.user})
+        return idempotency.storage_key(request, key)
+
+    def test_replayed_key_returns_stored_response(self):
+        first = self.create_order('key-1')
+
+        with patch('orders.serializers.OrderCreateSerializer.validate') \
+                as patched_validate:
+            second = self.create_order('key-1')
+
+        patched_validate.assert_not_called()
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(models.Order.objects.count(), 1)
+
+    def test_different_keys_create_different_orders(self):
+        self.create_order('key-1')
+        self.create_order('key-2')
+
+        self.assertEqual(models.Order.objects.count(), 2)
+
+    def test_requests_without_key_are_not_deduplicated(self):
+        self.client.post(ORDER_CREATE_URL, self.payload)
+        self.client.post(ORDER_CREATE_URL, self.payload)
+
+        self.assertEqual(models.Order.objects.count(), 2)
+
+    def test_key_is_scoped_to_user(self):
+        self.create_order('key-1')
+        self.client.force_authenticate(create_user(
+            email='other@user.com',
+            password='testpass',
+            name='Other name'
+        ))
+
+        res = self.create_order('key-1')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(models.Order.objects.count(), 2)
+
+    def test_key_reused_with_other_body_is_rejected(self):
+        self.create_order('key-1')
+
+        payload = dict(self.payload, delivery_address='other address')
+        res = self.create_order('key-1', payload)
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(models.Order.objects.count(), 1)
+
+    def test_validation_error_is_replayed(self):
+        payload = dict(self.payload, delivery_city='Cracow')
+
+        first = self.create_order('key-1', payload)
+        second = self.create_order('key-1', payload)
+
+        self.assertEqual(first.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+
+    def test_failed_request_releases_key(self):
+        with patch('orders.serializers.OrderCreateSerializer.create',
+                   side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.create_order('key-1')
+
+        res = self.create_order('key-1')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', res)
+        self.assertEqual(models.Order.objects.count(), 1)
+
+    def test_duplicate_of_unfinished_request_conflicts_at_once(self):
+        self.create_order('key-1')
+        key = self.storage_key('key-1')
+        cache.set(key, dict(cache.get(key), state=idempotency.PENDING))
+
+        with patch('time.sleep') as patched_sleep:
+            res = self.create_order('key-1')
+
+        patched_sleep.assert_not_called()
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(models.Order.objects.count(), 1)
+
+    def test_pending_marker_outlives_request(self):
+        with patch.object(cache, 'add', wraps=cache.add) as patched_add:
+            self.create_order('key-1')
+
+        self.assertEqual(patched_add.call_args.kwargs['timeout'],
+                         settings.IDEMPOTENCY_LOCK_TIMEOUT)
+
+    def test_too_long_key_is_rejected(self):
+        res = self.create_order('k' * 256)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(models.Order.objects.exists())
+
+    def test_bulk_creation_is_idempotent(self):
+        first = self.client.post(ORDER_BULK_URL, [self.payload],
+                                 HTTP_IDEMPOTENCY_KEY='key-1')
+        second = self.client.post(ORDER_BULK_URL, [self.payload],
+                                  HTTP_IDEMPOTENCY_KEY='key-1')
+
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(models.Order.objects.count(), 1)
@@ -1,12 +1,22 @@
+from decimal import Decimal
+
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 from django.utils import timezone
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework.test import APITestCase
 from rest_framework import status
 
+from oauth2_provider.models import AccessToken, Application
+
 from orders import serializers as order_serializers
 from core import models
+from user import authentication
 
 
 ORDERS_URL = reverse('orders:order-list')
@@ -101,10 +111,10 @@ class AuthenticatedOrderAPITests(APITestCase):
 
         res = self.client.get(ORDERS_URL)
 
-        orders = models.Order.objects.all()
+        orders = models.Order.objects.order_by('-order_time', '-id')
         serializer = order_serializers.OrderSerializer(orders, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retrieve_orders_limited_to_user(self):
         user2 = create_user(
@@ -121,8 +131,8 @@ class AuthenticatedOrderAPITests(APITestCase):
         serializer = order_serializers.OrderSerializer(orders, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retrieve_detail_order(self):
         order = sample_order(
@@ -242,3 +252,472 @@ class AuthenticatedOrderAPITests(APITestCase):
         res = self.client.post(ORDER_CREATE_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_create_order_reports_all_wrong_meals(self):
+        restaurant = sample_restaurant('restaurant1')
+        meal1 = sample_meal(name="meal1")
+        meal2 = sample_meal(name="meal2")
+        meal3 = sample_meal(name="meal3")
+
+        menu = models.Menu.objects.create(restaurant=restaurant)
+        menu.meals.set([meal1])
+
+        payload = {
+            "restaurant": restaurant.id,
+            "meals": [
+                {"meal": meal1.id, "quantity": 1},
+                {"meal": meal2.id, "quantity": 1},
+                {"meal": meal3.id, "quantity": 1}
+            ],
+            "drinks": [],
+            "delivery_city": "Warsaw",
+            "delivery_address": "some address",
+            "delivery_post_code": "01-223",
+            "delivery_phone": "some phone"
+        }
+
+        res = self.client.post(ORDER_CREATE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        msg = str(res.data['wrong meal'])
+        self.assertIn(str(meal2.id), msg)
+        self.assertIn(str(meal3.id), msg)
+
+    def test_menu_validation_uses_single_query(self):
+        restaurant = sample_restaurant('restaurant1')
+        meals = [sample_meal(name=f"meal{i}") for i in range(10)]
+
+        menu = models.Menu.objects.create(restaurant=restaurant)
+        menu.meals.set(meals)
+
+        data = [{'meal': meal, 'quantity': 1} for meal in meals]
+
+        with self.assertNumQueries(1):
+            order_serializers.calculate(meal=data, restaurant=restaurant)
+
+    def test_create_order_loads_items_in_fixed_queries(self):
+        restaurant = sample_restaurant('restaurant1')
+        meals = [sample_meal(name=f"meal{i}") for i in range(30)]
+
+        menu = models.Menu.objects.create(restaurant=restaurant)
+        menu.meals.set(meals)
+
+        payload = {
+            "restaurant": restaurant.id,
+            "meals": [{"meal": meal.id, "quantity": 1} for meal in meals],
+            "drinks": [],
+            "delivery_city": "Warsaw",
+            "delivery_address": "some address",
+            "delivery_post_code": "01-223",
+            "delivery_phone": "some phone"
+        }
+
+        """Meals, restaurant, menu, matrix and inserts in a savepoint"""
+        with self.assertNumQueries(8):
+            res = self.client.post(ORDER_CREATE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            models.OrderMeal.objects.filter(order=res.data['id']).count(), 30)
+
+    def test_create_order_with_unknown_meal(self):
+        restaurant = sample_restaurant('restaurant1')
+        meal = sample_meal(name="meal1")
+
+        menu = models.Menu.objects.create(restaurant=restaurant)
+        menu.meals.set([meal])
+
+        payload = {
+            "restaurant": restaurant.id,
+            "meals": [
+                {"meal": meal.id, "quantity": 1},
+                {"meal": meal.id + 100, "quantity": 1}
+            ],
+            "drinks": [],
+            "delivery_city": "Warsaw",
+            "delivery_address": "some address",
+            "delivery_post_code": "01-223",
+            "delivery_phone": "some phone"
+        }
+
+        res = self.client.post(ORDER_CREATE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('does not exist', str(res.data['meals']))
+
+    def test_create_order_merges_duplicated_items(self):
+        restaurant = sample_restaurant('restaurant1')
+        meal1 = sample_meal(name="meal1")
+        meal2 = sample_meal(name="meal2")
+        meal3 = sample_meal(name="meal3")
+
+        menu = models.Menu.objects.create(restaurant=restaurant)
+        menu.meals.set([meal1, meal2, meal3])
+
+        payload = {
+            "restaurant": restaurant.id,
+            "meals": [
+                {"meal": meal1.id, "quantity": 1},
+                {"meal": meal2.id, "quantity": 2},
+                {"meal": meal3.id, "quantity": 3},
+                {"meal": meal3.id, "quantity": 1},
+                {"meal": meal2.id, "quantity": 1}
+            ],
+            "drinks": [],
+            "delivery_city": "Warsaw",
+            "delivery_address": "some address",
+            "delivery_post_code": "01-223",
+            "delivery_phone": "some phone"
+        }
+
+        res = self.client.post(ORDER_CREATE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        order_meals = models.OrderMeal.objects.filter(order=res.data['id'])
+        self.assertEqual(
+            {meal.meal_id: meal.quantity for meal in order_meals},
+            {meal1.id: 1, meal2.id: 3, meal3.id: 4})
+        self.assertFalse(
+            models.OrderDrink.objects.filter(order=res.data['id']).exists())
+
+    def test_create_order_rejects_too_big_summed_quantity(self):
+        restaurant = sample_restaurant('restaurant1')
+        meal = sample_meal(name="meal1")
+
+        menu = models.Menu.objects.create(restaurant=restaurant)
+        menu.meals.set([meal])
+
+        payload = {
+            "restaurant": restaurant.id,
+            "meals": [
+                {"meal": meal.id, "quantity": 32767},
+                {"meal": meal.id, "quantity": 32767}
+            ],
+            "drinks": [],
+            "delivery_city": "Warsaw",
+            "delivery_address": "some address",
+            "delivery_post_code": "01-223",
+            "delivery_phone": "some phone"
+        }
+
+        res = self.client.post(ORDER_CREATE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('meal quantity', res.data)
+        self.assertFalse(models.Order.objects.exists())
+
+    def test_create_order_query_count_does_not_grow_with_items(self):
+        restaurant = sample_restaurant('restaurant1')
+        meals = [sample_meal(name=f"meal{i}") for i in range(20)]
+        drinks = [sample_drink(name=f"drink{i}") for i in range(20)]
+
+        menu = models.Menu.objects.create(restaurant=restaurant)
+        menu.meals.set(meals)
+        menu.drinks.set(drinks)
+
+        def create_order(size):
+            payload = {
+                "restaurant": restaurant.id,
+                "meals": [{"meal": meal.id, "quantity": 2}
+                          for meal in meals[:size]],
+                "drinks": [{"drink": drink.id, "quantity": 1}
+                           for drink in drinks[:size]],
+                "delivery_city": "Warsaw",
+                "delivery_address": "some address",
+                "delivery_post_code": "01-223",
+                "delivery_phone": "some phone"
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(
+                    ORDER_CREATE_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return models.Order.objects.get(id=res.data['id']), len(queries)
+
+        small_order, small_count = create_order(2)
+        big_order, big_count = create_order(20)
+
+        self.assertEqual(small_count, big_count)
+        self.assertEqual(small_order.total_price, 57.00)
+        self.assertEqual(big_order.total_price, 462.00)
+        self.assertEqual(
+            models.OrderMeal.objects.filter(order=big_order).count(), 20)
+        self.assertEqual(
+            models.OrderDrink.objects.filter(order=big_order).count(), 20)
+
+    def test_retrieve_detail_order_uses_prefetched_items(self):
+        order = sample_order(user=self.user)
+        for i in range(5):
+            models.OrderMeal.objects.create(
+                order=order, meal=sample_meal(name=f'meal{i}'), quantity=2)
+            models.OrderDrink.objects.create(
+                order=order, drink=sample_drink(name=f'drink{i}'))
+
+        url = detail_url(order.id)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['meals']), 5)
+        self.assertEqual(len(res.data['drinks']), 5)
+        self.assertEqual(
+            res.data, order_serializers.OrderDetailSerializer(order).data)
+
+    def test_create_order_above_thousand(self):
+        restaurant = sample_restaurant('restaurant1')
+        meal = sample_meal(name='meal1', price=999.99)
+        menu = models.Menu.objects.create(restaurant=restaurant)
+        menu.meals.set([meal])
+
+        payload = {
+            'restaurant': restaurant.id,
+            'meals': [{'meal': meal.id, 'quantity': 100}],
+            'drinks': [],
+            'delivery_city': 'Warsaw',
+            'delivery_address': 'some address',
+            'delivery_post_code': '01-223',
+            'delivery_phone': 'some phone'
+        }
+
+        res = self.client.post(ORDER_CREATE_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        order = models.Order.objects.get(id=res.data['id'])
+        self.assertEqual(order.total_price, Decimal('100011.00'))
+        self.assertEqual(order.ordermeal_set.get().line_total,
+                         Decimal('99999.00'))
+
+    def test_order_detail_shows_line_totals_from_creation(self):
+        restaurant = sample_restaurant('restaurant1')
+        meal = sample_meal(name='meal1', price=10.00)
+        menu = models.Menu.objects.create(restaurant=restaurant)
+        menu.meals.set([meal])
+        res = self.client.post(ORDER_CREATE_URL, {
+            'restaurant': restaurant.id,
+            'meals': [{'meal': meal.id, 'quantity': 2}],
+            'drinks': [],
+            'delivery_city': 'Warsaw',
+            'delivery_address': 'some address',
+            'delivery_post_code': '01-223',
+            'delivery_phone': 'some phone'
+        })
+
+        meal.price = 15.00
+        meal.save()
+
+        res = self.client.get(detail_url(res.data['id']))
+
+        self.assertEqual(res.data['total_price'], '32.00')
+        self.assertEqual(res.data['meals'][0]['total_price'], '20.00')
+
+    def test_order_detail_keeps_item_names_and_prices(self):
+        restaurant = sample_restaurant('restaurant1')
+        meal = sample_meal(name='meal1', price=10.00)
+        drink = sample_drink(name='drink1', price=3.00)
+        menu = models.Menu.objects.create(restaurant=restaurant)
+        menu.meals.set([meal])
+        menu.drinks.set([drink])
+        res = self.client.post(ORDER_CREATE_URL, {
+            'restaurant': restaurant.id,
+            'meals': [{'meal': meal.id, 'quantity': 2}],
+            'drinks': [{'drink': drink.id, 'quantity': 1}],
+            'delivery_city': 'Warsaw',
+            'delivery_address': 'some address',
+            'delivery_post_code': '01-223',
+            'delivery_phone': 'some phone'
+        }, format='json')
+
+        meal.name = 'renamed'
+        meal.price = 15.00
+        meal.save()
+        drink.name = 'renamed'
+        drink.price = 1.00
+        drink.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(detail_url(res.data['id']))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['meals'][0]['meal'], 'Meal1')
+        self.assertEqual(res.data['meals'][0]['price'], '10.00')
+        self.assertEqual(res.data['drinks'][0]['drink'], 'Drink1')
+        self.assertEqual(res.data['drinks'][0]['price'], '3.00')
+        self.assertFalse(any(
+            '"core_meal"' in query['sql'] or '"core_drink"' in query['sql']
+            for query in queries.captured_queries))
+
+    def test_create_order_stores_summary(self):
+        restaurant = sample_restaurant('restaurant1')
+        meal1 = sample_meal(name='meal1')
+        meal2 = sample_meal(name='meal2')
+        drink = sample_drink(name='drink1')
+
+        menu = models.Menu.objects.create(restaurant=restaurant)
+        menu.meals.set([meal1, meal2])
+        menu.drinks.set([drink])
+
+        payload = {
+            'restaurant': restaurant.id,
+            'meals': [
+                {'meal': meal1.id, 'quantity': 1},
+                {'meal': meal2.id, 'quantity': 3}
+            ],
+            'drinks': [{'drink': drink.id, 'quantity': 2}],
+            'delivery_city': 'Warsaw',
+            'delivery_address': 'some address',
+            'delivery_post_code': '01-223',
+            'delivery_phone': 'some phone'
+        }
+
+        res = self.client.post(ORDER_CREATE_URL, payload)
+
+        order = models.Order.objects.get(id=res.data['id'])
+        self.assertEqual(order.restaurant_name, 'Restaurant1')
+        self.assertEqual(order.item_count, 6)
+        self.assertEqual(order.top_items, '3x Meal2, 2x Drink1, 1x Meal1')
+
+        res = self.client.get(ORDERS_URL)
+
+        self.assertEqual(res.data['results'][0]['restaurant'], 'Restaurant1')
+        self.assertEqual(res.data['results'][0]['item_count'], 6)
+        self.assertEqual(res.data['results'][0]['top_items'],
+                         '3x Meal2, 2x Drink1, 1x Meal1')
+
+    def test_retrieve_orders_without_joins(self):
+        restaurant = sample_restaurant('testrestaurant')
+        for _ in range(5):
+            sample_order(user=self.user, restaurant=restaurant)
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(ORDERS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 5)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('JOIN', queries[0]['sql'])
+
+    def test_retrieve_orders_cursor_pagination(self):
+        restaurant = sample_restaurant('testrestaurant')
+        for _ in range(5):
+            sample_order(user=self.user, restaurant=restaurant)
+
+        res = self.client.get(ORDERS_URL, {'page_size': 2})
+        ids = [order['id'] for order in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            ids += [order['id'] for order in res.data['results']]
+
+        orders = models.Order.objects.order_by('-order_time', '-id')
+        self.assertEqual(ids, [order.id for order in orders])
+
+
+class AsyncOrderAPITests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        authentication.local_cache.clear()
+        self.user = create_user(
+            email='test@test.com',
+            password='testpass',
+            name='Test name'
+        )
+        self.access_token = AccessToken.objects.create(
+            user=self.user,
+            token='async-access-token',
+            application=Application.objects.create(
+                client_type=Application.CLIENT_CONFIDENTIAL,
+                authorization_grant_type=Application.GRANT_PASSWORD,
+                name='dummy',
+                user=self.user
+            ),
+            expires=timezone.now() + timedelta(days=1)
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {self.access_token.token}')
+
+    def test_async_login_required(self):
+        self.client.credentials()
+
+        res = self.client.get(reverse('order-list-async'))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_async_expired_token_is_rejected(self):
+        self.access_token.expires = timezone.now() - timedelta(seconds=1)
+        self.access_token.save()
+
+        res = self.client.get(reverse('order-list-async'))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_async_order_list_matches_sync(self):
+        user2 = create_user(
+            email='other@user.com',
+            password='testpass',
+            name='Other name'
+        )
+        sample_order(user=self.user)
+        sample_order(user=self.user)
+        sample_order(user=user2)
+
+        res = self.client.get(reverse('order-list-async'))
+        sync_res = self.client.get(ORDERS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()['results']), 2)
+        self.assertEqual(res.json()['results'], sync_res.json()['results'])
+
+    def test_async_order_list_pages(self):
+        orders = [sample_order(user=self.user) for _ in range(3)]
+        models.Order.objects.filter(id=orders[2].id)\
+            .update(order_time=orders[1].order_time)
+
+        res = self.client.get(reverse('order-list-async'), {'page_size': 2})
+        next_res = self.client.get(res.json()['next'])
+
+        expected = models.Order.objects.filter(user=self.user)\
+            .order_by('-order_time', '-id')
+        self.assertEqual(
+            [order['id'] for order in res.json()['results']
+             + next_res.json()['results']],
+            [order.id for order in expected])
+        self.assertIsNone(next_res.json()['next'])
+
+    def test_async_order_list_invalid_cursor(self):
+        res = self.client.get(reverse('order-list-async'),
+                              {'after': '2026-01-01_x'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_async_order_detail_matches_sync(self):
+        order = sample_order(user=self.user)
+        models.OrderMeal.objects.create(
+            order=order, meal=sample_meal(name='meal1'), quantity=2)
+
+        with self.assertNumQueries(4):
+            res = self.client.get(
+                reverse('order-detail-async', args=[order.id]))
+        sync_res = self.client.get(detail_url(order.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), sync_res.json())
+
+    def test_async_order_detail_limited_to_user(self):
+        user2 = create_user(
+            email='other@user.com',
+            password='testpass',
+            name='Other name'
+        )
+        order = sample_order(user=user2)
+
+        res = self.client.get(reverse('order-detail-async', args=[order.id]))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_async_token_is_served_from_cache(self):
+        self.client.get(reverse('order-list-async'))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(reverse('order-list-async'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -11,5 +11,6 @@ app_name = 'orders'
 
 urlpatterns = [
     path('create/', views.OrderCreateView.as_view(), name='order-create'),
+    path('bulk/', views.OrderBulkCreateView.as_view(), name='order-bulk'),
     path('', include(router.urls)),
 ]
@@ -1,21 +1,44 @@
-from rest_framework import generics, viewsets, mixins
+from rest_framework import generics, viewsets, mixins, status
+from rest_framework.response import Response
 
+from django.conf import settings
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils.translation import gettext_lazy as _
+
+from .bulk import preload, create_orders
+from .idempotency import IdempotentCreateMixin
 from .serializers import (OrderSerializer,
                           OrderCreateSerializer,
-                          OrderDetailSerializer)
+                          OrderDetailSerializer,
+                          BulkOrderSerializer)
 
 from core.models import Order
+from core.pagination import (OrderCursorPagination, keyset_page,
+                             keyset_page_size, order_cursor,
+                             parse_order_cursor)
+from core.views import detail_response, require_safe_async
+from user.authentication import authenticate_async
 
 
 class OrderViewSet(viewsets.GenericViewSet,
                    mixins.ListModelMixin,
                    mixins.RetrieveModelMixin):
     serializer_class = OrderSerializer
+    pagination_class = OrderCursorPagination
     queryset = Order.objects.all()
     lookup_field = 'id'
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user)
+        """Restaurant is shown from order summary, no join needed"""
+        queryset = self.queryset.filter(user=self.request.user)
+
+        """Lines carry their names and prices, no meal or drink is read"""
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(
+                'ordermeal_set', 'orderdrink_set')
+
+        return queryset
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -25,9 +48,132 @@ class OrderViewSet(viewsets.GenericViewSet,
         return self.serializer_class
 
 
-class OrderCreateView(generics.CreateAPIView):
+class OrderCreateView(IdempotentCreateMixin, generics.CreateAPIView):
     serializer_class = OrderCreateSerializer
 
     def perform_create(self, serializer):
         """Create order with authenticated user"""
         serializer.save(user=self.request.user)
+
+
+class BulkCreateOrdersMixin:
+
+    def create(self, request, *args, **kwargs):
+        """Create valid orders from list, report errors of the others"""
+        orders = request.data
+
+        if not isinstance(orders, list) or not orders:
+            msg = _("Expected non-empty list of orders")
+            return Response({'detail': msg},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if len(orders) > settings.ORDER_BULK_MAX_SIZE:
+            msg = _(f"Cannot create more than "
+                    f"{settings.ORDER_BULK_MAX_SIZE} orders at once")
+            return Response({'detail': msg},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        context = self.get_serializer_context()
+        context['preloaded'] = preload(orders)
+
+        valid, results = [], []
+        for index, data in enumerate(orders):
+            serializer = self.get_serializer_class()(
+                data=data, context=context)
+
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                results.append({'index': index,
+                                'status': 'failed',
+                                'errors': serializer.errors})
+
+        created = create_orders(request.user,
+                                [data for index, data in valid],
+                                context['preloaded'])
+
+        for (index, data), order in zip(valid, created):
+            results.append({
+                'index': index,
+                'status': 'created',
+                'order': self.get_serializer_class()(
+                    order, context=context).data
+            })
+        results.sort(key=lambda result: result['index'])
+
+        if not created:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif len(created) < len(orders):
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_201_CREATED
+
+        return Response({'created': len(created),
+                         'failed': len(orders) - len(created),
+                         'results': results},
+                        status=response_status)
+
+
+class OrderBulkCreateView(IdempotentCreateMixin,
+                          BulkCreateOrdersMixin,
+                          generics.GenericAPIView):
+    serializer_class = BulkOrderSerializer
+
+    def post(self, request, *args, **kwargs):
+        return self.create(request, *args, **kwargs)
+
+
+"""
+Read endpoints served natively by ASGI deployment, queries and cache
+are awaited, so request waiting for them does not hold a thread
+"""
+
+NOT_AUTHENTICATED = 'Authentication credentials were not provided.'
+
+
+@require_safe_async
+async def order_list_async(request):
+    """Orders from the newest one, next page starts after ?after= cursor"""
+    user = await authenticate_async(request)
+    if user is None:
+        return detail_response(NOT_AUTHENTICATED,
+                               status.HTTP_401_UNAUTHORIZED)
+
+    queryset = Order.objects.filter(user=user).order_by('-order_time', '-id')
+    after = request.GET.get('after')
+
+    if after is not None:
+        try:
+            order_time, order_id = parse_order_cursor(after)
+        except ValueError:
+            return detail_response('Invalid cursor',
+                                   status.HTTP_404_NOT_FOUND)
+        queryset = queryset.filter(
+            Q(order_time__lt=order_time) |
+            Q(order_time=order_time, id__lt=order_id))
+
+    page_size = keyset_page_size(request, settings.ORDERS_PAGE_SIZE)
+    orders, next_url = keyset_page(
+        request,
+        [order async for order in queryset[:page_size + 1]],
+        page_size,
+        order_cursor)
+
+    return JsonResponse({
+        'next': next_url,
+        'results': OrderSerializer(orders, many=True).data})
+
+
+@require_safe_async
+async def order_detail_async(request, id):
+    user = await authenticate_async(request)
+    if user is None:
+        return detail_response(NOT_AUTHENTICATED,
+                               status.HTTP_401_UNAUTHORIZED)
+
+    order = await Order.objects.filter(user=user, id=id)\
+        .prefetch_related('ordermeal_set', 'orderdrink_set').afirst()
+    if order is None:
+        return detail_response('Not found.', status.HTTP_404_NOT_FOUND)
+
+    return JsonResponse(OrderDetailSerializer(order).data)
@@ -0,0 +1,135 @@
+"""
+Cache of serialized restaurant menus and their versions.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from core.cache import acall_cache, call_cache
+
+MENU_KEY = 'restaurant:menu:{0}'
+STATS_KEY = 'restaurant:menu-cache:{0}'
+VERSION_KEY = 'restaurant:menu-version:{0}'
+
+
+def menu_key(slug):
+    return MENU_KEY.format(slug)
+
+
+def version_key(slug):
+    return VERSION_KEY.format(slug)
+
+
+def get_version(slug):
+    """Return cached version of restaurant detail or None"""
+    return call_cache(cache.get, version_key(slug), default=None)
+
+
+def start_version(slug):
+    """
+    Start version of existing restaurant. Counter starts from current
+    time in ms, so version lost from cache is never handed out again.
+    Returns None when Redis is unavailable.
+    """
+    key = version_key(slug)
+    call_cache(cache.add, key, int(time.time() * 1000),
+               timeout=settings.RESTAURANT_VERSION_TIMEOUT)
+    return get_version(slug)
+
+
+async def aget_version(slug):
+    return await acall_cache(cache.aget, version_key(slug), default=None)
+
+
+async def astart_version(slug):
+    await acall_cache(cache.aadd, version_key(slug), int(time.time() * 1000),
+                      timeout=settings.RESTAURANT_VERSION_TIMEOUT)
+    return await aget_version(slug)
+
+
+def format_etag(version):
+    return f'"{version}"'
+
+
+def bump_versions(keys):
+    for key in keys:
+        try:
+            call_cache(cache.incr, key)
+        except ValueError:
+            """Missing counter is started again on next read"""
+            pass
+
+
+def count(name):
+    """Increase hit or miss counter"""
+    key = STATS_KEY.format(name)
+    try:
+        call_cache(cache.incr, key)
+    except ValueError:
+        call_cache(cache.set, key, 1, timeout=None)
+
+
+async def acount(name):
+    key = STATS_KEY.format(name)
+    try:
+        await acall_cache(cache.aincr, key)
+    except ValueError:
+        await acall_cache(cache.aset, key, 1, timeout=None)
+
+
+def get_stats():
+    """Return menu cache hit and miss counters"""
+    keys = {name: STATS_KEY.format(name) for name in ('hits', 'misses')}
+    values = call_cache(cache.get_many, keys.values(), default={})
+    return {name: values.get(key, 0) for name, key in keys.items()}
+
+
+def get_menu(slug, build_menu):
+    """Return cached menu or build and cache it, Redis errors are misses"""
+    key = menu_key(slug)
+    menu = call_cache(cache.get, key, default=None)
+
+    if menu is not None:
+        count('hits')
+        return menu
+
+    count('misses')
+    menu = build_menu()
+    call_cache(cache.set, key, menu, timeout=settings.MENU_CACHE_TIMEOUT)
+    return menu
+
+
+async def aget_menu(slug, build_menu):
+    """Async get_menu(), build_menu is coroutine function"""
+    key = menu_key(slug)
+    menu = await acall_cache(cache.aget, key, default=None)
+
+    if menu is not None:
+        await acount('hits')
+        return menu
+
+    await acount('misses')
+    menu = await build_menu()
+    await acall_cache(cache.aset, key, menu,
+                      timeout=settings.MENU_CACHE_TIMEOUT)
+    return menu
+
+
+def invalidate_menus(slugs):
+    """Drop cached menus and bump versions now and once again after commit"""
+    slugs = set(slugs)
+    keys = [menu_key(slug) for slug in slugs]
+    versions = [version_key(slug) for slug in slugs]
+
+    if not keys:
+        return
+
+    def invalidate():
+        call_cache(cache.delete_many, keys)
+        bump_versions(versions)
+
+    invalidate()
+    transaction.on_commit(invalidate)
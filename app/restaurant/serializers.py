@@ -1,7 +1,19 @@
 from rest_framework import serializers
 
+from django.db.models import Prefetch
+
 from core.models import Restaurant, Menu, Meal, Drink, Ingredient
 
+from . import cache
+
+
+def menu_queryset():
+    """Menus with all meals and drinks loaded in fixed number of queries"""
+    return Menu.objects.prefetch_related(
+        Prefetch('meals', queryset=Meal.objects.select_related('tag')
+                 .prefetch_related('ingredients')),
+        Prefetch('drinks', queryset=Drink.objects.select_related('tag')))
+
 
 class DrinkSerializer(serializers.ModelSerializer):
     tag = serializers.StringRelatedField()
@@ -27,7 +39,7 @@ class MealSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
     def get_ingredients(self, obj):
-        return obj.ingredients.values_list('name', flat=True)
+        return [ingredient.name for ingredient in obj.ingredients.all()]
 
 
 class MenuSerializer(serializers.ModelSerializer):
@@ -55,5 +67,8 @@ class RestaurantDetailSerializer(RestaurantSerializer):
         lookup_field = 'slug'
 
     def get_menu(self, obj):
-        menu = Menu.objects.get(restaurant=obj)
+        return cache.get_menu(obj.slug, lambda: self.build_menu(obj))
+
+    def build_menu(self, obj):
+        menu = menu_queryset().get(restaurant=obj)
         return MenuSerializer(menu, many=False).data
@@ -0,0 +1,81 @@
+"""
+Invalidate cached menus and restaurant detail versions when anything
+shown in them changes.
+"""
+
+from django.db.models import signals
+from django.dispatch import receiver
+
+from core.models import (Restaurant, Cuisine, Menu, Meal, Drink, Ingredient,
+                         Tag)
+
+from .cache import invalidate_menus
+
+"""Lookups from restaurant to objects shown in its menu"""
+MENU_LOOKUPS = {
+    Cuisine: ('cuisine',),
+    Menu: ('menu',),
+    Meal: ('menu__meals',),
+    Drink: ('menu__drinks',),
+    Ingredient: ('menu__meals__ingredients',),
+    Tag: ('menu__meals__tag', 'menu__drinks__tag'),
+}
+
+
+def restaurant_slugs(instance):
+    """Return slugs of restaurants which menu contains instance"""
+    slugs = set()
+
+    for lookup in MENU_LOOKUPS[type(instance)]:
+        slugs.update(Restaurant.objects.filter(**{lookup: instance})
+                     .values_list('slug', flat=True))
+
+    return slugs
+
+
+@receiver(signals.pre_save, sender=Restaurant)
+@receiver(signals.pre_delete, sender=Restaurant)
+def invalidate_changed_restaurant(sender, instance, **kwargs):
+    """Renamed restaurant leaves its old slug too"""
+    slugs = {instance.slug}
+
+    if instance.pk is not None:
+        slugs.update(Restaurant.objects.filter(pk=instance.pk)
+                     .values_list('slug', flat=True))
+
+    invalidate_menus(slugs)
+
+
+@receiver(signals.post_save, sender=Cuisine)
+@receiver(signals.post_save, sender=Menu)
+@receiver(signals.post_save, sender=Meal)
+@receiver(signals.post_save, sender=Drink)
+@receiver(signals.post_save, sender=Ingredient)
+@receiver(signals.post_save, sender=Tag)
+@receiver(signals.pre_delete, sender=Cuisine)
+@receiver(signals.pre_delete, sender=Menu)
+@receiver(signals.pre_delete, sender=Meal)
+@receiver(signals.pre_delete, sender=Drink)
+@receiver(signals.pre_delete, sender=Ingredient)
+@receiver(signals.pre_delete, sender=Tag)
+def invalidate_changed_menu(sender, instance, **kwargs):
+    invalidate_menus(restaurant_slugs(instance))
+
+
+@receiver(signals.m2m_changed, sender=Menu.meals.through)
+@receiver(signals.m2m_changed, sender=Menu.drinks.through)
+@receiver(signals.m2m_changed, sender=Meal.ingredients.through)
+def invalidate_changed_relation(sender, instance, action, reverse,
+                                model, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    """Reverse changes touch menus of every object from pk_set"""
+    if reverse and pk_set:
+        slugs = set()
+        for obj in model.objects.filter(pk__in=pk_set):
+            slugs.update(restaurant_slugs(obj))
+    else:
+        slugs = restaurant_slugs(instance)
+
+    invalidate_menus(slugs)
@@ -1,9 +1,18 @@
+from unittest.mock import patch
+
 from rest_framework.test import APITestCase
 from rest_framework import status
 
+from django.conf import settings
 from django.urls import reverse
+from django.core.cache import cache
+
+from redis.exceptions import RedisError
+
+from core.models import (Restaurant, Menu, Cuisine, Meal, Drink, Tag,
+                         Ingredient)
 
-from core.models import Restaurant, Menu, Cuisine
+from restaurant import cache as menu_cache
 
 from restaurant.serializers import (RestaurantDetailSerializer,
                                     RestaurantSerializer)
@@ -25,6 +34,9 @@ def sample_restaurant(**params):
 
 class RestaurantAPITests(APITestCase):
 
+    def setUp(self):
+        cache.clear()
+
     def test_retrieve_restaurant_list(self):
         params = {
             'name': 'testname',
@@ -44,7 +56,7 @@ class RestaurantAPITests(APITestCase):
         serializer = RestaurantSerializer(restaurants, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_retrieve_restaurant_detail(self):
         params = {
@@ -89,5 +101,444 @@ class RestaurantAPITests(APITestCase):
         serial2 = RestaurantSerializer(rest2).data
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertIn(serial1, res.data)
-        self.assertNotIn(serial2, res.data)
+        self.assertIn(serial1, res.data['results'])
+        self.assertNotIn(serial2, res.data['results'])
+
+    def test_search_with_cuisine_case_insensitive(self):
+        params = {
+            'name': 'testname',
+            'city': 'Warsaw',
+            'address': 'testaddress',
+            'post_code': '01-111',
+            'phone': 'testphone',
+            'cuisine': sample_cuisine('Italian'),
+            'delivery_price': 7.50
+        }
+        rest1 = sample_restaurant(**params)
+        params['name'] = 'testname2'
+        params['cuisine'] = sample_cuisine('polish')
+        rest2 = sample_restaurant(**params)
+
+        res = self.client.get(RESTAURANTS_URL, {'cuisine': 'ITALIAN'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(RestaurantSerializer(rest1).data, res.data['results'])
+        self.assertNotIn(
+            RestaurantSerializer(rest2).data, res.data['results'])
+
+    def test_restaurant_list_query_count(self):
+        params = {
+            'city': 'Warsaw',
+            'address': 'testaddress',
+            'post_code': '01-111',
+            'phone': 'testphone',
+            'delivery_price': 7.50
+        }
+        for i in range(10):
+            sample_restaurant(
+                name=f'testname{i}',
+                cuisine=sample_cuisine(f'testcuisine{i}'),
+                **params)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RESTAURANTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 10)
+
+    def test_restaurant_list_cursor_pagination(self):
+        params = {
+            'city': 'Warsaw',
+            'address': 'testaddress',
+            'post_code': '01-111',
+            'phone': 'testphone',
+            'cuisine': sample_cuisine('testcuisine'),
+            'delivery_price': 7.50
+        }
+        for i in range(5):
+            sample_restaurant(name=f'testname{i}', **params)
+
+        res = self.client.get(RESTAURANTS_URL, {'page_size': 2})
+        pages = [res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            pages.append(res.data['results'])
+
+        restaurants = Restaurant.objects.all().order_by('id')
+        serializer = RestaurantSerializer(restaurants, many=True)
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(
+            [item for page in pages for item in page], serializer.data)
+
+    def test_restaurant_detail_query_count(self):
+        restaurant = sample_restaurant(
+            name='testname',
+            city='Warsaw',
+            address='testaddress',
+            post_code='01-111',
+            phone='testphone',
+            cuisine=sample_cuisine('testcuisine'),
+            delivery_price=7.50
+        )
+        menu = Menu.objects.create(restaurant=restaurant)
+        for i in range(10):
+            tag = Tag.objects.create(name=f'testtag{i}')
+            meal = Meal.objects.create(
+                name=f'testmeal{i}',
+                price=10.00,
+                description='testdescription',
+                tag=tag
+            )
+            meal.ingredients.set([
+                Ingredient.objects.create(name=f'testingredient{i}'),
+                Ingredient.objects.create(name=f'otheringredient{i}')
+            ])
+            menu.meals.add(meal)
+            menu.drinks.add(Drink.objects.create(
+                name=f'testdrink{i}', price=2.50, tag=tag))
+        cache.clear()
+
+        with self.assertNumQueries(5):
+            res = self.client.get(detail_url(restaurant.slug))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['menu']['meals']), 10)
+        self.assertEqual(len(res.data['menu']['drinks']), 10)
+        meals = {meal['name']: meal for meal in res.data['menu']['meals']}
+        self.assertEqual(meals['testmeal0']['tag'], 'Testtag0')
+        self.assertEqual(
+            sorted(meals['testmeal0']['ingredients']),
+            ['otheringredient0', 'testingredient0'])
+
+
+class RestaurantMenuCacheTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.restaurant = sample_restaurant(
+            name='testname',
+            city='Warsaw',
+            address='testaddress',
+            post_code='01-111',
+            phone='testphone',
+            cuisine=sample_cuisine('testcuisine'),
+            delivery_price=7.50
+        )
+        self.tag = Tag.objects.create(name='testtag')
+        self.meal = Meal.objects.create(
+            name='testmeal',
+            price=10.00,
+            description='testdescription',
+            tag=self.tag
+        )
+        self.menu = Menu.objects.create(restaurant=self.restaurant)
+        self.menu.meals.set([self.meal])
+        self.url = detail_url(self.restaurant.slug)
+
+    def get_menu(self):
+        return self.client.get(self.url).data['menu']
+
+    def test_menu_is_served_from_cache(self):
+        self.client.get(self.url)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(menu_cache.get_stats(), {'hits': 1, 'misses': 1})
+
+    def test_meal_change_invalidates_menu(self):
+        self.get_menu()
+
+        self.meal.price = 15.00
+        self.meal.save()
+
+        self.assertEqual(self.get_menu()['meals'][0]['price'], '15.00')
+
+    def test_menu_change_invalidates_menu(self):
+        self.get_menu()
+
+        self.menu.meals.remove(self.meal)
+        self.assertEqual(self.get_menu()['meals'], [])
+
+        self.meal.menu_set.add(self.menu)
+        self.assertEqual(len(self.get_menu()['meals']), 1)
+
+    def test_ingredient_change_invalidates_menu(self):
+        ingredient = Ingredient.objects.create(name='testingredient')
+        self.get_menu()
+
+        self.meal.ingredients.add(ingredient)
+        self.assertEqual(
+            self.get_menu()['meals'][0]['ingredients'], ['testingredient'])
+
+        ingredient.name = 'otheringredient'
+        ingredient.save()
+        self.assertEqual(
+            self.get_menu()['meals'][0]['ingredients'], ['otheringredient'])
+
+    def test_tag_change_invalidates_menu(self):
+        self.get_menu()
+
+        self.tag.name = 'othertag'
+        self.tag.save()
+
+        self.assertEqual(self.get_menu()['meals'][0]['tag'], 'Othertag')
+
+    def test_other_restaurant_menu_stays_cached(self):
+        other = sample_restaurant(
+            name='othername',
+            city='Warsaw',
+            address='testaddress',
+            post_code='01-111',
+            phone='testphone',
+            cuisine=sample_cuisine('othercuisine'),
+            delivery_price=7.50
+        )
+        Menu.objects.create(restaurant=other)
+        self.client.get(detail_url(other.slug))
+
+        self.meal.price = 15.00
+        self.meal.save()
+
+        self.assertIsNotNone(cache.get(menu_cache.menu_key(other.slug)))
+        self.assertIsNone(cache.get(menu_cache.menu_key(self.restaurant.slug)))
+
+    def test_menu_is_built_without_redis(self):
+        with patch.object(cache, 'get', side_effect=RedisError), \
+                patch.object(cache, 'set', side_effect=RedisError), \
+                patch.object(cache, 'incr', side_effect=RedisError):
+            menu = menu_cache.get_menu(self.restaurant.slug, lambda: 'menu')
+
+        self.assertEqual(menu, 'menu')
+
+
+class RestaurantConditionalGetTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.restaurant = sample_restaurant(
+            name='testname',
+            city='Warsaw',
+            address='testaddress',
+            post_code='01-111',
+            phone='testphone',
+            cuisine=sample_cuisine('testcuisine'),
+            delivery_price=7.50
+        )
+        self.meal = Meal.objects.create(
+            name='testmeal',
+            price=10.00,
+            description='testdescription',
+            tag=Tag.objects.create(name='testtag')
+        )
+        menu = Menu.objects.create(restaurant=self.restaurant)
+        menu.meals.set([self.meal])
+        self.url = detail_url(self.restaurant.slug)
+
+    def get_etag(self):
+        return self.client.get(self.url)['ETag']
+
+    def test_detail_has_etag_and_cache_control(self):
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['ETag'].startswith('"'))
+        self.assertIn('public', res['Cache-Control'])
+        self.assertIn('s-maxage=60', res['Cache-Control'])
+
+    def test_matching_etag_returns_not_modified_without_queries(self):
+        etag = self.get_etag()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(res.content, b'')
+
+    def test_other_etag_returns_full_response(self):
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('menu', res.data)
+
+    def test_menu_change_changes_etag(self):
+        etag = self.get_etag()
+
+        self.meal.price = 15.00
+        self.meal.save()
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_restaurant_and_cuisine_change_changes_etag(self):
+        etag = self.get_etag()
+        self.restaurant.delivery_price = 9.50
+        self.restaurant.save()
+        self.assertNotEqual(self.get_etag(), etag)
+
+        etag = self.get_etag()
+        self.restaurant.cuisine.name = 'othercuisine'
+        self.restaurant.cuisine.save()
+        self.assertNotEqual(self.get_etag(), etag)
+
+    def test_renamed_restaurant_old_slug_is_not_modified_no_more(self):
+        etag = self.get_etag()
+
+        self.restaurant.name = 'othername'
+        self.restaurant.save()
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_lost_version_is_not_reused(self):
+        with patch('restaurant.cache.time.time', return_value=1000):
+            etag = self.get_etag()
+
+        cache.delete(menu_cache.version_key(self.restaurant.slug))
+
+        with patch('restaurant.cache.time.time', return_value=1001):
+            self.assertNotEqual(self.get_etag(), etag)
+
+    def test_missing_restaurant_is_not_found_for_any_etag(self):
+        url = detail_url('no-such-slug')
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', res)
+        self.assertIsNone(cache.get(menu_cache.version_key('no-such-slug')))
+
+    def test_any_etag_matches_existing_restaurant(self):
+        self.get_etag()
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_deleted_restaurant_is_not_modified_no_more(self):
+        etag = self.get_etag()
+
+        self.restaurant.delete()
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_version_expires(self):
+        with patch.object(cache, 'add', wraps=cache.add) as patched_add:
+            self.get_etag()
+
+        self.assertEqual(patched_add.call_args.kwargs['timeout'],
+                         settings.RESTAURANT_VERSION_TIMEOUT)
+
+    def test_detail_without_redis(self):
+        with patch.object(cache, 'get', side_effect=RedisError), \
+                patch.object(cache, 'add', side_effect=RedisError), \
+                patch.object(cache, 'set', side_effect=RedisError), \
+                patch.object(cache, 'incr', side_effect=RedisError):
+            res = self.client.get(self.url, HTTP_IF_NONE_MATCH='"1"')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', res)
+        self.assertEqual(res.data['menu']['meals'][0]['name'], 'testmeal')
+
+
+class AsyncRestaurantAPITests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        params = {
+            'city': 'Warsaw',
+            'address': 'testaddress',
+            'post_code': '01-111',
+            'phone': 'testphone',
+            'cuisine': sample_cuisine('testcuisine'),
+            'delivery_price': 7.50
+        }
+        self.restaurants = [sample_restaurant(name=f'testname{i}', **params)
+                            for i in range(3)]
+        self.restaurant = self.restaurants[0]
+        menu = Menu.objects.create(restaurant=self.restaurant)
+        menu.meals.set([Meal.objects.create(
+            name='testmeal',
+            price=10.00,
+            description='testdescription',
+            tag=Tag.objects.create(name='testtag')
+        )])
+        self.url = reverse('restaurant-detail-async',
+                           args=[self.restaurant.slug])
+
+    def test_async_restaurant_list_matches_sync(self):
+        res = self.client.get(reverse('restaurant-list-async'),
+                              {'cuisine': 'TestCuisine'})
+        sync_res = self.client.get(RESTAURANTS_URL,
+                                   {'cuisine': 'TestCuisine'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()['results']), 3)
+        self.assertEqual(res.json()['results'], sync_res.json()['results'])
+
+    def test_async_restaurant_list_pages(self):
+        res = self.client.get(reverse('restaurant-list-async'),
+                              {'page_size': 2})
+        next_res = self.client.get(res.json()['next'])
+
+        self.assertEqual(
+            [restaurant['id'] for restaurant in res.json()['results']
+             + next_res.json()['results']],
+            [restaurant.id for restaurant in self.restaurants])
+        self.assertIsNone(next_res.json()['next'])
+
+    def test_async_restaurant_list_invalid_cursor(self):
+        res = self.client.get(reverse('restaurant-list-async'),
+                              {'after': 'wrong'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_async_restaurant_detail_matches_sync(self):
+        res = self.client.get(self.url)
+        sync_res = self.client.get(detail_url(self.restaurant.slug))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), sync_res.json())
+        self.assertEqual(res['ETag'], sync_res['ETag'])
+        self.assertIn('public', res['Cache-Control'])
+
+    def test_async_restaurant_detail_uses_menu_cache(self):
+        self.client.get(detail_url(self.restaurant.slug))
+
+        with patch('restaurant.views.menu_queryset') as patched_menu:
+            res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        patched_menu.assert_not_called()
+
+    def test_async_restaurant_detail_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_async_restaurant_detail_not_found(self):
+        url = reverse('restaurant-detail-async', args=['missing'])
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_async_restaurant_detail_without_redis(self):
+        with patch('django.core.cache.cache.aget', side_effect=RedisError):
+            res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['menu']['meals'][0]['name'], 'testmeal')
+
+    def test_async_restaurant_list_is_read_only(self):
+        res = self.client.post(reverse('restaurant-list-async'), {})
+
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
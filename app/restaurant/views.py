@@ -1,8 +1,44 @@
-from rest_framework import viewsets, mixins, permissions
+from rest_framework import viewsets, mixins, permissions, status
+from rest_framework.response import Response
 
-from .serializers import RestaurantDetailSerializer, RestaurantSerializer
+from django.conf import settings
+from django.db.models.functions import Lower
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+
+from .serializers import (RestaurantDetailSerializer, RestaurantSerializer,
+                          MenuSerializer, menu_queryset)
+from . import cache
 
 from core.models import Restaurant
+from core.pagination import (RestaurantCursorPagination, keyset_page,
+                             keyset_page_size)
+from core.views import detail_response, require_safe_async
+
+
+def restaurant_queryset(cuisine=''):
+    """Params filtering"""
+    queryset = Restaurant.objects.select_related('cuisine')
+    cuisine = str(cuisine).lower()
+
+    """Case-insensitive match served by lower(name) index"""
+    if cuisine != '':
+        queryset = queryset.alias(cuisine_name=Lower('cuisine__name'))\
+            .filter(cuisine_name=cuisine)
+
+    return queryset
+
+
+def patch_detail_headers(response, etag):
+    """Without Redis there is no version to tag response with"""
+    if etag is not None:
+        response['ETag'] = etag
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=settings.RESTAURANT_HTTP_MAX_AGE,
+        s_maxage=settings.RESTAURANT_HTTP_SHARED_MAX_AGE)
 
 
 class RestaurantViewSet(viewsets.GenericViewSet,
@@ -10,18 +46,41 @@ class RestaurantViewSet(viewsets.GenericViewSet,
                         mixins.RetrieveModelMixin):
     serializer_class = RestaurantSerializer
     permission_classes = (permissions.AllowAny,)
+    pagination_class = RestaurantCursorPagination
     queryset = Restaurant.objects.all()
     lookup_field = 'slug'
 
     def get_queryset(self):
-        """Params filtering"""
-        queryset = self.queryset
-        cuisine = str(self.request.query_params.get('cuisine', '')).lower()
+        return restaurant_queryset(
+            self.request.query_params.get('cuisine', ''))
 
-        if cuisine != '':
-            queryset = queryset.filter(cuisine__name=cuisine)
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Answer conditional request from cached version before any query.
+        Version is started only after restaurant was found, and changes
+        when restaurant is renamed or deleted, so it never matches slug
+        without restaurant.
+        """
+        slug = kwargs[self.lookup_field]
+        etags = parse_etags(request.headers.get('If-None-Match', ''))
+        version = cache.get_version(slug)
+        instance = None
 
-        return queryset
+        if version is None or '*' in etags:
+            instance = self.get_object()
+            if version is None:
+                version = cache.start_version(slug)
+
+        etag = cache.format_etag(version) if version is not None else None
+
+        if etag is not None and (etag in etags or '*' in etags):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(
+                self.get_serializer(instance or self.get_object()).data)
+
+        patch_detail_headers(response, etag)
+        return response
 
     def get_serializer_class(self):
         """Return appropraite serializer class"""
@@ -29,3 +88,71 @@ class RestaurantViewSet(viewsets.GenericViewSet,
             return RestaurantDetailSerializer
 
         return self.serializer_class
+
+
+"""
+Read endpoints served natively by ASGI deployment, queries and cache
+are awaited, so request waiting for them does not hold a thread
+"""
+
+
+@require_safe_async
+async def restaurant_list_async(request):
+    """Restaurants by id, next page starts after id given in ?after="""
+    queryset = restaurant_queryset(request.GET.get('cuisine', ''))\
+        .order_by('id')
+    after = request.GET.get('after')
+
+    if after is not None:
+        try:
+            queryset = queryset.filter(id__gt=int(after))
+        except ValueError:
+            return detail_response('Invalid cursor',
+                                   status.HTTP_404_NOT_FOUND)
+
+    page_size = keyset_page_size(request, settings.RESTAURANTS_PAGE_SIZE)
+    restaurants, next_url = keyset_page(
+        request,
+        [restaurant async for restaurant in queryset[:page_size + 1]],
+        page_size,
+        lambda restaurant: restaurant.id)
+
+    return JsonResponse({
+        'next': next_url,
+        'results': RestaurantSerializer(restaurants, many=True).data})
+
+
+@require_safe_async
+async def restaurant_detail_async(request, slug):
+    """Same conditional response as RestaurantViewSet.retrieve()"""
+    etags = parse_etags(request.headers.get('If-None-Match', ''))
+    version = await cache.aget_version(slug)
+    queryset = restaurant_queryset().filter(slug=slug)
+    instance = None
+
+    if version is None or '*' in etags:
+        instance = await queryset.afirst()
+        if instance is None:
+            return detail_response('Not found.', status.HTTP_404_NOT_FOUND)
+        if version is None:
+            version = await cache.astart_version(slug)
+
+    etag = cache.format_etag(version) if version is not None else None
+
+    if etag is not None and (etag in etags or '*' in etags):
+        response = HttpResponseNotModified()
+    else:
+        instance = instance or await queryset.afirst()
+        if instance is None:
+            return detail_response('Not found.', status.HTTP_404_NOT_FOUND)
+
+        async def build_menu():
+            menu = await menu_queryset().aget(restaurant=instance)
+            return MenuSerializer(menu, many=False).data
+
+        data = RestaurantSerializer(instance).data
+        data['menu'] = await cache.aget_menu(slug, build_menu)
+        response = JsonResponse(data)
+
+    patch_detail_headers(response, etag)
+    return response
@@ -0,0 +1,243 @@
+"""
+OAuth2 authentication with validated access tokens kept in cache.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+from oauth2_provider.models import get_access_token_model
+
+from core.cache import LocalCache, MISSING, acall_cache, call_cache
+
+TOKEN_KEY = 'user:token:{0}'
+USER_KEY = 'user:fields:{0}'
+
+local_cache = LocalCache(
+    maxsize=settings.TOKEN_LOCAL_CACHE_SIZE,
+    timeout=settings.TOKEN_LOCAL_CACHE_TIMEOUT)
+
+
+def token_key(token):
+    """Cache key which does not reveal the token itself"""
+    return TOKEN_KEY.format(hashlib.sha256(token.encode()).hexdigest())
+
+
+def user_key(user_id):
+    return USER_KEY.format(user_id)
+
+
+def user_fields(user):
+    """Plain field values of user, password hash is never cached"""
+    return {field.attname: getattr(user, field.attname)
+            for field in user._meta.concrete_fields
+            if field.attname != 'password'}
+
+
+def build_user(fields):
+    """
+    New user instance for every request, password is deferred
+    and loaded from database only when it is used
+    """
+    User = get_user_model()
+    names = [field.attname for field in User._meta.concrete_fields
+             if field.attname in fields]
+    return User.from_db(DEFAULT_DB_ALIAS, names,
+                        [fields[name] for name in names])
+
+
+def get_cached(key):
+    value = local_cache.get(key)
+
+    if value is MISSING:
+        value = call_cache(cache.get, key, MISSING)
+        if value is not MISSING:
+            local_cache.set(key, value)
+
+    return value
+
+
+def set_cached(key, value, timeout):
+    local_cache.set(key, value, timeout)
+    call_cache(cache.set, key, value, timeout=timeout)
+
+
+async def aget_cached(key):
+    value = local_cache.get(key)
+
+    if value is MISSING:
+        value = await acall_cache(cache.aget, key, MISSING)
+        if value is not MISSING:
+            local_cache.set(key, value)
+
+    return value
+
+
+async def aset_cached(key, value, timeout):
+    local_cache.set(key, value, timeout)
+    await acall_cache(cache.aset, key, value, timeout=timeout)
+
+
+def invalidate_tokens(tokens):
+    keys = [token_key(token) for token in tokens]
+
+    for key in keys:
+        local_cache.delete(key)
+    call_cache(cache.delete_many, keys)
+
+
+def invalidate_user(user_id):
+    local_cache.delete(user_key(user_id))
+    call_cache(cache.delete, user_key(user_id))
+
+
+def token_timeout(access_token):
+    """Keep validated token until its expiry at the latest"""
+    return min(
+        settings.TOKEN_CACHE_TIMEOUT,
+        int((access_token.expires - timezone.now()).total_seconds()))
+
+
+def token_data(access_token):
+    return {
+        'id': access_token.id,
+        'user_id': access_token.user_id,
+        'application_id': access_token.application_id,
+        'scope': access_token.scope,
+        'expires': access_token.expires,
+    }
+
+
+def build_access_token(token, data, user):
+    """Return (user, access token) of cached token or None if expired"""
+    access_token = get_access_token_model()(
+        id=data['id'],
+        token=token,
+        user=user,
+        application_id=data['application_id'],
+        scope=data['scope'],
+        expires=data['expires'])
+
+    if not access_token.is_valid():
+        return None
+
+    return user, access_token
+
+
+def cache_token(access_token, user):
+    timeout = token_timeout(access_token)
+
+    if timeout <= 0:
+        return
+
+    set_cached(token_key(access_token.token), token_data(access_token),
+               timeout)
+    set_cached(user_key(user.id), user_fields(user),
+               settings.TOKEN_CACHE_TIMEOUT)
+
+
+async def acache_token(access_token, user):
+    timeout = token_timeout(access_token)
+
+    if timeout <= 0:
+        return
+
+    await aset_cached(token_key(access_token.token),
+                      token_data(access_token), timeout)
+    await aset_cached(user_key(user.id), user_fields(user),
+                      settings.TOKEN_CACHE_TIMEOUT)
+
+
+def get_cached_token(token):
+    """Return (user, access token) from cache or None"""
+    data = get_cached(token_key(token))
+
+    if data is MISSING:
+        return None
+
+    fields = get_cached(user_key(data['user_id']))
+
+    if fields is MISSING:
+        user = get_user_model().objects.filter(id=data['user_id']).first()
+        if user is None:
+            return None
+        fields = user_fields(user)
+        set_cached(user_key(user.id), fields, settings.TOKEN_CACHE_TIMEOUT)
+
+    return build_access_token(token, data, build_user(fields))
+
+
+async def aget_cached_token(token):
+    """Async get_cached_token()"""
+    data = await aget_cached(token_key(token))
+
+    if data is MISSING:
+        return None
+
+    fields = await aget_cached(user_key(data['user_id']))
+
+    if fields is MISSING:
+        user = await get_user_model().objects\
+            .filter(id=data['user_id']).afirst()
+        if user is None:
+            return None
+        fields = user_fields(user)
+        await aset_cached(user_key(user.id), fields,
+                          settings.TOKEN_CACHE_TIMEOUT)
+
+    return build_access_token(token, data, build_user(fields))
+
+
+def bearer_token(header):
+    """Return token of Authorization header value or None"""
+    header = header.split()
+
+    if len(header) == 2 and header[0].lower() == 'bearer':
+        return header[1]
+
+    return None
+
+
+async def authenticate_async(request):
+    """Return user of bearer token for async views or None"""
+    token = bearer_token(request.headers.get('Authorization', ''))
+
+    if token is None:
+        return None
+
+    cached = await aget_cached_token(token)
+    if cached is not None:
+        return cached[0]
+
+    access_token = await get_access_token_model().objects\
+        .select_related('user').filter(token=token).afirst()
+    if access_token is None or not access_token.is_valid():
+        return None
+
+    await acache_token(access_token, access_token.user)
+    return access_token.user
+
+
+class CachedOAuth2Authentication(OAuth2Authentication):
+    """OAuth2 authentication which checks cache before database"""
+
+    def authenticate(self, request):
+        token = bearer_token(request.META.get('HTTP_AUTHORIZATION', ''))
+
+        if token is not None:
+            cached = get_cached_token(token)
+            if cached is not None:
+                return cached
+
+        result = super().authenticate(request)
+
+        if result is not None:
+            user, access_token = result
+            cache_token(access_token, user)
+
+        return result
@@ -0,0 +1,101 @@
+"""
+Chunked removal of expired OAuth2 tokens and grants.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from oauth2_provider.models import (get_access_token_model,
+                                    get_refresh_token_model,
+                                    get_grant_model)
+from oauth2_provider.settings import oauth2_settings
+
+PROGRESS_KEY = 'user:token-cleanup'
+
+"""Phases in the same order as oauth2_provider.models.clear_expired"""
+PHASES = (
+    'revoked_refresh_tokens',
+    'expired_refresh_tokens',
+    'expired_access_tokens',
+    'expired_grants',
+)
+
+
+def phase_queryset(phase, now):
+    refresh_expire_seconds = oauth2_settings.REFRESH_TOKEN_EXPIRE_SECONDS
+
+    if phase.endswith('refresh_tokens') and not refresh_expire_seconds:
+        return get_refresh_token_model().objects.none()
+
+    if not isinstance(refresh_expire_seconds, timedelta):
+        refresh_expire_seconds = timedelta(seconds=refresh_expire_seconds or 0)
+    refresh_expire_at = now - refresh_expire_seconds
+
+    if phase == 'revoked_refresh_tokens':
+        return get_refresh_token_model().objects.filter(
+            revoked__lt=refresh_expire_at)
+    if phase == 'expired_refresh_tokens':
+        return get_refresh_token_model().objects.filter(
+            access_token__expires__lt=refresh_expire_at)
+    if phase == 'expired_access_tokens':
+        return get_access_token_model().objects.filter(
+            Q(refresh_token__isnull=True) & Q(expires__lt=now))
+    return get_grant_model().objects.filter(expires__lt=now)
+
+
+def get_progress():
+    """Return progress of the last cleanup run"""
+    return cache.get(PROGRESS_KEY)
+
+
+def start_run():
+    """
+    Resume unfinished run or start a new one. Return None when
+    unfinished run is still active and will continue by itself.
+    """
+    progress = get_progress()
+
+    if progress and not progress['finished']:
+        stalled_at = progress['updated'] + timedelta(
+            seconds=settings.TOKEN_CLEANUP_STALL_TIMEOUT)
+        return progress if stalled_at < timezone.now() else None
+
+    progress = {
+        'started': timezone.now(),
+        'updated': timezone.now(),
+        'finished': None,
+        'phase': 0,
+        'batches': 0,
+        'deleted': {phase: 0 for phase in PHASES},
+    }
+    cache.set(PROGRESS_KEY, progress, timeout=None)
+    return progress
+
+
+def delete_batch(progress):
+    """Delete one batch of current phase and store progress"""
+    phase = PHASES[progress['phase']]
+    queryset = phase_queryset(phase, progress['started'])
+    ids = list(queryset.order_by('id').values_list('id', flat=True)
+               [:settings.TOKEN_CLEANUP_BATCH_SIZE])
+
+    if ids:
+        queryset.model.objects.filter(id__in=ids).delete()
+
+    progress['deleted'][phase] += len(ids)
+    progress['batches'] += 1
+    progress['updated'] = timezone.now()
+
+    """Short batch means there is nothing more to delete in this phase"""
+    if len(ids) < settings.TOKEN_CLEANUP_BATCH_SIZE:
+        progress['phase'] += 1
+
+    if progress['phase'] == len(PHASES):
+        progress['finished'] = timezone.now()
+
+    cache.set(PROGRESS_KEY, progress, timeout=None)
+    return progress
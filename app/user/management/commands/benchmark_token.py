@@ -0,0 +1,78 @@
+"""
+Command to compare latency of token issuing paths used by token form views.
+"""
+
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from oauth2_provider.models import (get_access_token_model,
+                                    get_refresh_token_model)
+
+from user.tasks import generate_token
+from user.tokens import create_token
+
+
+class Command(BaseCommand):
+    """Benchmark token issuing command."""
+    help = 'Compare in-process token issuing with Celery round trip'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', required=True)
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--runs', type=int, default=20)
+        parser.add_argument(
+            '--celery',
+            action='store_true',
+            help='Also measure delay().get() through the configured broker')
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def measure(self, name, issue, runs):
+        timings = []
+
+        for _ in range(runs):
+            start = time.perf_counter()
+            data = issue()
+            timings.append((time.perf_counter() - start) * 1000)
+
+            if 'access_token' not in data:
+                raise CommandError(f'{name} failed: {data}')
+
+        p50 = statistics.median(timings)
+        p95 = statistics.quantiles(timings, n=20)[-1] \
+            if len(timings) > 1 else timings[0]
+        self.stdout.write(
+            f'{name:<16} mean {statistics.mean(timings):8.2f} ms  '
+            f'p50 {p50:8.2f} ms  p95 {p95:8.2f} ms')
+
+    def handle(self, *args, **options):
+        """Entrypoint"""
+        user = get_user_model().objects.get(email=options['email'])
+        credentials = {
+            'username': options['email'],
+            'password': options['password']
+        }
+        access_tokens = set(get_access_token_model().objects
+                            .filter(user=user).values_list('id', flat=True))
+        refresh_tokens = set(get_refresh_token_model().objects
+                             .filter(user=user).values_list('id', flat=True))
+        runs = options['runs']
+
+        try:
+            self.measure(
+                'in-process', lambda: create_token(**credentials), runs)
+
+            if options['celery']:
+                self.measure(
+                    'celery',
+                    lambda: generate_token.delay(
+                        **credentials).get(timeout=options['timeout']),
+                    runs)
+        finally:
+            """Remove tokens issued by benchmark"""
+            get_refresh_token_model().objects.filter(user=user)\
+                .exclude(id__in=refresh_tokens).delete()
+            get_access_token_model().objects.filter(user=user)\
+                .exclude(id__in=access_tokens).delete()
@@ -0,0 +1,42 @@
+"""
+Drop cached access tokens and users when they change.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models import signals
+from django.dispatch import receiver
+from django.utils import timezone
+
+from oauth2_provider.models import (get_access_token_model,
+                                    get_application_model)
+
+from .authentication import invalidate_tokens, invalidate_user
+from .tokens import invalidate_token_core
+
+
+@receiver(signals.post_save, sender=get_access_token_model())
+def invalidate_changed_token(sender, instance, **kwargs):
+    invalidate_tokens([instance.token])
+
+
+@receiver(signals.post_delete, sender=get_access_token_model())
+def invalidate_revoked_token(sender, instance, **kwargs):
+    """
+    Cached tokens never outlive their expiry, so expired tokens
+    removed by clear_expired_tokens are already gone from cache.
+    """
+    if instance.expires > timezone.now():
+        invalidate_tokens([instance.token])
+
+
+@receiver(signals.post_save, sender=get_user_model())
+@receiver(signals.post_delete, sender=get_user_model())
+def invalidate_changed_user(sender, instance, **kwargs):
+    invalidate_user(instance.id)
+
+
+@receiver(signals.post_save, sender=get_application_model())
+@receiver(signals.post_delete, sender=get_application_model())
+def invalidate_changed_application(sender, instance, **kwargs):
+    """Rotated secret or deleted client must not mint tokens any more"""
+    invalidate_token_core(instance.client_id)
@@ -1,14 +1,10 @@
 from celery import shared_task
 
-import httpx
-
-import os
-
-from app.wsgi import application
-
 from django.core.mail import send_mail
 from django.conf import settings
-from django.urls import reverse
+
+from . import cleanup
+from .tokens import create_token
 
 
 @shared_task
@@ -21,21 +17,28 @@ def send_reset_password_email(email_subject, email_body, to_whom):
     )
 
 
-@shared_task
-def clear_expired_tokens():
-    from oauth2_provider.models import clear_expired
-    clear_expired()
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def clear_expired_tokens(self, chained=False):
+    """
+    Delete one batch of expired tokens and queue the next one.
+    Expired tokens are not cached, see user.signals.
+    """
+    progress = cleanup.get_progress() if chained else cleanup.start_run()
+
+    if progress is None or progress['finished']:
+        return progress
+
+    progress = cleanup.delete_batch(progress)
+
+    if not progress['finished']:
+        self.apply_async(
+            kwargs={'chained': True},
+            countdown=settings.TOKEN_CLEANUP_BATCH_INTERVAL)
+
+    return progress
 
 
 @shared_task
-def generate_token(domain, **params):
-    data = {
-        'grant_type': os.environ.get('GRANT_TYPE1'),
-        'client_id': os.environ.get('CLIENT_ID'),
-        'client_secret': os.environ.get('CLIENT_SECRET')
-    }
-    data.update(**params)
-
-    with httpx.Client(app=application, base_url=f'https://{domain}') as client:
-        response = client.post(reverse('drf:token'), json=data)
-    return response.json()
+def generate_token(domain=None, **params):
+    """Issue token in worker, domain is kept for already queued tasks"""
+    return create_token(**params)
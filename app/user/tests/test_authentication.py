@@ -0,0 +1,130 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from oauth2_provider.models import AccessToken, Application
+
+from datetime import timedelta
+
+from user import authentication
+from user.tests.test_cleanup import run_cleanup
+
+USER_DETAIL_URL = reverse('user:user-detail')
+CHANGE_PASSWORD_URL = reverse('user:password-change')
+
+
+class CachedAuthenticationTests(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        authentication.local_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            name='testname',
+            password='testpassword'
+        )
+        self.app = Application.objects.create(
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+            name='dummy',
+            user=self.user
+        )
+        self.access_token = AccessToken.objects.create(
+            user=self.user,
+            token='secret-access-token-key',
+            application=self.app,
+            expires=timezone.now() + timedelta(days=1)
+        )
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {self.access_token.token}')
+
+    def test_token_is_served_from_cache(self):
+        self.client.get(USER_DETAIL_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(USER_DETAIL_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_token_is_served_from_redis_without_local_cache(self):
+        self.client.get(USER_DETAIL_URL)
+        authentication.local_cache.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(USER_DETAIL_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_revoked_token_is_rejected(self):
+        self.client.get(USER_DETAIL_URL)
+
+        self.access_token.revoke()
+        res = self.client.get(USER_DETAIL_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_token_is_bounded_by_expiry(self):
+        self.client.get(USER_DETAIL_URL)
+        key = authentication.token_key(self.access_token.token)
+        data = authentication.get_cached(key)
+        data['expires'] = timezone.now() - timedelta(seconds=1)
+        authentication.set_cached(key, data, 60)
+        AccessToken.objects.filter(id=self.access_token.id)\
+            .update(expires=data['expires'])
+
+        res = self.client.get(USER_DETAIL_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_user_is_new_instance_without_password(self):
+        self.client.get(USER_DETAIL_URL)
+        token = self.access_token.token
+
+        user, _ = authentication.get_cached_token(token)
+        other_user, _ = authentication.get_cached_token(token)
+
+        self.assertIsNot(user, other_user)
+        self.assertEqual(user.id, other_user.id)
+        self.assertNotIn('password', authentication.get_cached(
+            authentication.user_key(self.user.id)))
+        self.assertEqual(user.get_deferred_fields(), {'password'})
+
+    def test_password_change_with_cached_user(self):
+        self.client.get(USER_DETAIL_URL)
+
+        res = self.client.patch(CHANGE_PASSWORD_URL, {
+            'old_password': 'testpassword',
+            'new_password': 'newpassword'
+        })
+
+        self.user.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(self.user.check_password('newpassword'))
+        self.assertEqual(self.client.get(USER_DETAIL_URL).data['email'],
+                         self.user.email)
+
+    def test_user_change_invalidates_cached_user(self):
+        self.client.get(USER_DETAIL_URL)
+
+        self.user.name = 'othername'
+        self.user.save()
+        res = self.client.get(USER_DETAIL_URL)
+
+        self.assertEqual(res.data['name'], 'othername')
+
+    @patch('user.signals.invalidate_tokens')
+    def test_clear_expired_tokens_skips_cache(self, patched_invalidate):
+        AccessToken.objects.filter(id=self.access_token.id)\
+            .update(expires=timezone.now() - timedelta(days=1))
+
+        run_cleanup()
+
+        self.assertFalse(AccessToken.objects.exists())
+        patched_invalidate.assert_not_called()
@@ -0,0 +1,118 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from oauth2_provider.models import AccessToken, RefreshToken, Application
+
+from datetime import timedelta
+
+from user import cleanup
+from user.tasks import clear_expired_tokens
+
+
+def run_cleanup():
+    """Run cleanup task and the batches it queues one after another"""
+    with patch('user.tasks.clear_expired_tokens.apply_async') as patched:
+        progress = clear_expired_tokens()
+        while patched.called:
+            patched.reset_mock()
+            progress = clear_expired_tokens(chained=True)
+
+    return progress
+
+
+@override_settings(TOKEN_CLEANUP_BATCH_SIZE=2)
+class TokenCleanupTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            name='testname',
+            password='testpassword'
+        )
+        self.app = Application.objects.create(
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+            name='dummy',
+            user=self.user
+        )
+
+    def sample_token(self, name, expires):
+        return AccessToken.objects.create(
+            user=self.user,
+            token=name,
+            application=self.app,
+            expires=timezone.now() + expires
+        )
+
+    def test_expired_tokens_are_deleted_in_batches(self):
+        for i in range(5):
+            self.sample_token(f'expired{i}', timedelta(days=-1))
+        valid = self.sample_token('valid', timedelta(days=1))
+
+        progress = run_cleanup()
+
+        self.assertEqual(list(AccessToken.objects.all()), [valid])
+        self.assertEqual(progress['deleted']['expired_access_tokens'], 5)
+        self.assertIsNotNone(progress['finished'])
+        self.assertEqual(cleanup.get_progress(), progress)
+
+    def test_expired_refresh_tokens_are_deleted(self):
+        expired = self.sample_token('expired', timedelta(days=-2))
+        RefreshToken.objects.create(
+            user=self.user,
+            token='expired-refresh',
+            application=self.app,
+            access_token=expired
+        )
+        RefreshToken.objects.create(
+            user=self.user,
+            token='revoked-refresh',
+            application=self.app,
+            revoked=timezone.now() - timedelta(days=2)
+        )
+
+        progress = run_cleanup()
+
+        self.assertFalse(RefreshToken.objects.exists())
+        self.assertEqual(progress['deleted']['revoked_refresh_tokens'], 1)
+        self.assertEqual(progress['deleted']['expired_refresh_tokens'], 1)
+
+    def test_batch_queues_next_batch(self):
+        for i in range(3):
+            self.sample_token(f'expired{i}', timedelta(days=-1))
+
+        with patch('user.tasks.clear_expired_tokens.apply_async') as patched:
+            clear_expired_tokens()
+
+        patched.assert_called_once_with(
+            kwargs={'chained': True}, countdown=1)
+
+    def test_stalled_run_is_resumed(self):
+        for i in range(5):
+            self.sample_token(f'expired{i}', timedelta(days=-1))
+        progress = cleanup.start_run()
+        progress['phase'] = 2
+        progress = cleanup.delete_batch(progress)
+        progress['updated'] -= timedelta(hours=1)
+        cache.set(cleanup.PROGRESS_KEY, progress)
+
+        progress = run_cleanup()
+
+        self.assertFalse(AccessToken.objects.exists())
+        self.assertEqual(progress['deleted']['expired_access_tokens'], 5)
+
+    def test_active_run_is_not_started_twice(self):
+        self.sample_token('expired', timedelta(days=-1))
+        cleanup.start_run()
+
+        with patch('user.tasks.clear_expired_tokens.apply_async') as patched:
+            progress = clear_expired_tokens()
+
+        self.assertIsNone(progress)
+        patched.assert_not_called()
+        self.assertTrue(AccessToken.objects.exists())
@@ -0,0 +1,155 @@
+import time
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from oauth2_provider.models import Application, get_access_token_model
+
+from user import tokens
+from user.tasks import generate_token
+from user.tokens import create_token
+
+TOKEN_GENERATE_URL = reverse('token-generate')
+TOKEN_REFRESH_URL = reverse('token-refresh')
+
+
+class TokenTests(TestCase):
+
+    def setUp(self):
+        tokens.token_cores.clear()
+        self.user = get_user_model().objects.create_user(
+            email='test@test.com',
+            name='testname',
+            password='testpassword'
+        )
+        self.app = Application.objects.create(
+            client_id='test-client-id',
+            client_secret='test-client-secret',
+            client_type=Application.CLIENT_CONFIDENTIAL,
+            authorization_grant_type=Application.GRANT_PASSWORD,
+            name='dummy',
+            user=self.user
+        )
+        patcher = patch.dict('os.environ', {
+            'GRANT_TYPE1': 'password',
+            'GRANT_TYPE2': 'refresh_token',
+            'CLIENT_ID': 'test-client-id',
+            'CLIENT_SECRET': 'test-client-secret'
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_create_token_with_password(self):
+        data = create_token(username='test@test.com', password='testpassword')
+
+        self.assertIn('access_token', data)
+        self.assertIn('refresh_token', data)
+        self.assertTrue(get_access_token_model().objects.filter(
+            user=self.user, token=data['access_token']).exists())
+
+    def test_create_token_with_wrong_password(self):
+        data = create_token(username='test@test.com', password='wrong')
+
+        self.assertNotIn('access_token', data)
+        self.assertEqual(data['error'], 'invalid_grant')
+
+    def test_create_token_with_refresh_token(self):
+        first = create_token(username='test@test.com', password='testpassword')
+
+        data = create_token(
+            grant_type='refresh_token',
+            refresh_token=first['refresh_token'])
+
+        self.assertIn('access_token', data)
+        self.assertNotEqual(data['access_token'], first['access_token'])
+
+    def test_bearer_token_form_view(self):
+        res = self.client.post(TOKEN_GENERATE_URL, {
+            'email': 'test@test.com',
+            'password': 'testpassword'
+        })
+
+        token = get_access_token_model().objects.get(user=self.user)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.context['access_token'], token.token)
+
+    def test_refresh_token_form_view(self):
+        first = create_token(username='test@test.com', password='testpassword')
+
+        res = self.client.post(TOKEN_REFRESH_URL, {
+            'refresh_token': first['refresh_token']
+        })
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('access_token', res.context)
+        self.assertNotEqual(res.context['access_token'], first['access_token'])
+
+    def test_client_application_is_validated_once(self):
+        create_token(username='test@test.com', password='testpassword')
+
+        with patch('user.tokens.check_password') as patched_check, \
+                CaptureQueriesContext(connection) as queries:
+            data = create_token(
+                username='test@test.com', password='testpassword')
+
+        self.assertIn('access_token', data)
+        patched_check.assert_not_called()
+        self.assertFalse(any(
+            query['sql'].startswith(
+                'SELECT "oauth2_provider_application"')
+            for query in queries.captured_queries))
+
+    def test_create_token_with_wrong_client_secret(self):
+        data = create_token(
+            username='test@test.com',
+            password='testpassword',
+            client_secret='wrong')
+
+        self.assertEqual(data, {'error': 'invalid_client'})
+
+    def test_rotated_secret_is_rejected(self):
+        create_token(username='test@test.com', password='testpassword')
+
+        self.app.client_secret = 'rotated-client-secret'
+        self.app.save()
+
+        self.assertEqual(
+            create_token(username='test@test.com', password='testpassword'),
+            {'error': 'invalid_client'})
+        self.assertIn('access_token', create_token(
+            username='test@test.com',
+            password='testpassword',
+            client_secret='rotated-client-secret'))
+
+    def test_deleted_application_is_rejected(self):
+        create_token(username='test@test.com', password='testpassword')
+
+        self.app.delete()
+
+        self.assertEqual(
+            create_token(username='test@test.com', password='testpassword'),
+            {'error': 'invalid_client'})
+
+    def test_validated_client_expires(self):
+        create_token(username='test@test.com', password='testpassword')
+        Application.objects.filter(id=self.app.id).update(
+            client_secret='changed-without-signals')
+
+        with patch('core.cache.time.monotonic',
+                   return_value=time.monotonic() + 3600):
+            data = create_token(
+                username='test@test.com', password='testpassword')
+
+        self.assertEqual(data, {'error': 'invalid_client'})
+
+    def test_generate_token_task(self):
+        data = generate_token.apply(kwargs={
+            'username': 'test@test.com',
+            'password': 'testpassword'
+        }).get()
+
+        self.assertIn('access_token', data)
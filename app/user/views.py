@@ -14,14 +14,13 @@ from django.urls import reverse_lazy
 from django.contrib.messages.views import SuccessMessageMixin
 from django.shortcuts import render
 from django.views.generic.edit import FormView
-from django.contrib.sites.shortcuts import get_current_site
 from django.contrib.auth import get_user_model
 
 from .forms import (BearerTokenForm,
                     UserCreateForm,
                     RefreshTokenForm)
 
-from .tasks import generate_token
+from .tokens import create_token
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -97,12 +96,9 @@ class BearerTokenFormView(FormView):
     form_class = BearerTokenForm
 
     def form_valid(self, form):
-        host = get_current_site(self.request).domain
-        result = generate_token.delay(
-            domain=host,
+        data = create_token(
             username=form.cleaned_data['email'],
             password=form.cleaned_data['password'])
-        data = result.get()
 
         try:
             access_token = data['access_token']
@@ -133,12 +129,9 @@ class RefreshTokenFormView(FormView):
     form_class = RefreshTokenForm
 
     def form_valid(self, form):
-        host = get_current_site(self.request).domain
-        result = generate_token.delay(
-            domain=host,
+        data = create_token(
             refresh_token=form.cleaned_data['refresh_token'],
             grant_type=os.environ.get('GRANT_TYPE2'))
-        data = result.get()
 
         try:
             access_token = data['access_token']